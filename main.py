@@ -1,6 +1,5 @@
 import sys
 from src.framework.cli import cli
-from src.framework.manager import ManagerAgent
 from src.utils.helpers import load_config
 
 def main():
@@ -14,6 +13,8 @@ def main():
         cli()
     else:
         # Otherwise, initialize the manager agent and run a default task
+        from src.framework.manager import ManagerAgent
+
         manager = ManagerAgent(config)
         task = "Analyze and refactor a sample Python file."
         result = manager.run_task(task)
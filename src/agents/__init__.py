@@ -1,2 +1,9 @@
-from .coding import CodingAgent
-from .research import ResearchAgent
\ No newline at end of file
+import importlib
+
+# Agents are imported on first access; RAG reads their metadata from the plugin manifest instead
+_EXPORTS = {"CodingAgent": ".coding", "ResearchAgent": ".research"}
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,4 +1,9 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
 from src.framework.core import BaseAgent
+from src.utils.code_chunks import estimate_tokens, split_for_budget
+
+ANALYZE_INSTRUCTION = "Analyze the following Python code for potential improvements and identify any bugs"
 
 class CodingAgent(BaseAgent):
     def __init__(self, config):
@@ -10,14 +15,91 @@ class CodingAgent(BaseAgent):
             system_prompt="You are a coding expert. Provide detailed code analysis, refactoring suggestions, or generate code as requested."
         )
 
-    def analyze_code(self, code: str) -> str:
-        prompt = f"Analyze the following Python code for potential improvements and identify any bugs:\n\n{code}"
+        self.token_budget = config.get("chunk_token_budget", 6000)
+        self.chunk_workers = config.get("chunk_workers", 4)
+
+    def analyze_code(self, code: str, chunked: bool = None) -> str:
+        instruction = ANALYZE_INSTRUCTION
+        if self.use_chunks(code, chunked):
+            return self.map_reduce(code, instruction, "Merge these per-section code analyses into one report. Remove duplicates and order findings by severity.")
+        prompt = f"{instruction}:\n\n{code}"
         return self.call(prompt)
 
-    def refactor_code(self, code: str) -> str:
-        prompt = f"Provide refactoring suggestions for the following Python code. Include variable renaming, improved readability, and potential bug fixes:\n\n{code}"
+    def analyze_chunk(self, chunk: Dict[str, Any]) -> str:
+        """Findings for one function, method or class chunk from code_chunks.chunk_source, without the reply wrapper."""
+        return self.unwrap(self.call(f"{ANALYZE_INSTRUCTION}. Code ({chunk['path']}, {chunk['kind']} {chunk['name']}):\n\n{chunk['text']}"))
+
+    def optimize_hotspots(self, report: str, hotspots: List[Dict[str, Any]]) -> str:
+        """Optimization suggestions for profiled hotspots, given only their sources and measurements."""
+        sources = "\n\n".join(
+            f"# {hotspot['path']}:{hotspot['start_line']}-{hotspot['end_line']} {hotspot['kind']} {hotspot['name']} ({'; '.join(hotspot['measurements'])})\n{hotspot['text']}"
+            for hotspot in hotspots
+        )
+        prompt = (
+            "A profiler measured the program below. Suggest optimizations for the hotspot functions only, based on the measurements. "
+            "Return every function you change in full in a ```python block, keeping its name, signature and behaviour.\n\n"
+            f"Profile:\n{report}\n\nHotspot sources:\n\n{sources}"
+        )
+        return self.unwrap(self.call(prompt))
+
+    def refactor_code(self, code: str, chunked: bool = None) -> str:
+        instruction = "Provide refactoring suggestions for the following Python code. Include variable renaming, improved readability, and potential bug fixes"
+        if self.use_chunks(code, chunked):
+            return self.map_reduce(code, instruction, "Merge these per-section refactoring suggestions into one coherent plan. Remove duplicates and keep renames consistent across sections.")
+        prompt = f"{instruction}:\n\n{code}"
         return self.call(prompt)
 
+    def use_chunks(self, code: str, chunked: bool = None) -> bool:
+        """Chunk explicitly when asked, otherwise only when the code would not fit the token budget."""
+        return estimate_tokens(code) > self.token_budget if chunked is None else chunked
+
+    def unwrap(self, response: str) -> str:
+        return response.removeprefix(f"{self.name}: ").removesuffix(f" End of {self.name} Response")
+
+    def map_reduce(self, code: str, instruction: str, reduce_instruction: str) -> str:
+        """Run instruction over AST-bounded chunks in parallel, then merge the findings.
+
+        Chunk prompts hold only the chunk and the context it references, never line numbers,
+        so unchanged chunks hit the response cache when another function in the file changes.
+        """
+        chunks = split_for_budget(code, self.token_budget)
+        if len(chunks) == 1:
+            return self.call(f"{instruction}:\n\n{code}")
+
+        def analyze(chunk) -> str:
+            context = f"Context from the rest of the module (for reference only):\n{chunk['context']}\n\n" if chunk["context"] else ""
+            return self.unwrap(self.call(f"{instruction}. {context}Code ({chunk['name']}):\n\n{chunk['text']}"))
+
+        self.logger.info(f"Analyzing {len(chunks)} chunks with up to {self.chunk_workers} in parallel")
+        with ThreadPoolExecutor(max_workers=self.chunk_workers) as executor:
+            findings = list(executor.map(analyze, chunks))
+
+        sections = [
+            f"Section {chunk['name']} (lines {chunk['start_line']}-{chunk['end_line']}):\n{finding}"
+            for chunk, finding in zip(chunks, findings)
+        ]
+        return self.reduce(sections, reduce_instruction)
+
+    def reduce(self, sections: List[str], reduce_instruction: str) -> str:
+        """Merge sections in one call, or in parallel groups first when they exceed the token budget."""
+        if len(sections) > 1 and estimate_tokens("\n\n".join(sections)) > self.token_budget:
+            groups, current, size = [], [], 0
+            for section in sections:
+                tokens = estimate_tokens(section)
+                if current and size + tokens > self.token_budget:
+                    groups.append(current)
+                    current, size = [], 0
+                current.append(section)
+                size += tokens
+            groups.append(current)
+            if len(groups) < len(sections):
+                with ThreadPoolExecutor(max_workers=self.chunk_workers) as executor:
+                    merged = list(executor.map(lambda group: self.unwrap(self.call(f"{reduce_instruction}\n\n" + "\n\n".join(group))), groups))
+                return self.reduce(merged, reduce_instruction)
+        return self.call(f"{reduce_instruction}\n\n" + "\n\n".join(sections))
+
     def generate_code(self, description: str) -> str:
         prompt = f"Generate Python code based on the following description:\n\n{description}"
-        return self.call(prompt)
\ No newline at end of file
+        return self.call(prompt)
+
+Agent = CodingAgent
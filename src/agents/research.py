@@ -19,4 +19,6 @@ class ResearchAgent(BaseAgent):
             prompt = f"Answer the following question using the provided web context:\nQuestion: {question}\nWeb Context:\n{web_context}"
         else:
             prompt = f"Answer the following question:\n{question}"
-        return self.call(prompt)
\ No newline at end of file
+        return self.call(prompt)
+
+Agent = ResearchAgent
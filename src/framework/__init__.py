@@ -1,3 +1,9 @@
-from .core import BaseAgent, RAG
-from .manager import ManagerAgent
-from .cli import cli
\ No newline at end of file
+import importlib
+
+# Resolved on first access so commands that never touch a model don't import ollama
+_EXPORTS = {"BaseAgent": ".core", "RAG": ".core", "ManagerAgent": ".manager", "cli": ".cli"}
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,219 @@
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from src.utils.fake_ollama import FakeOllamaServer
+from src.utils.tracing import percentile
+
+# Run in a fresh interpreter so cold startup includes imports, the plugin scan and description embedding
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from src.framework.manager import ManagerAgent
+imported = time.perf_counter()
+with open(sys.argv[1]) as f:
+    manager = ManagerAgent(json.load(f))
+print(json.dumps({"import_s": imported - started, "init_s": time.perf_counter() - imported, "items": len(manager.rag.cache)}))
+"""
+
+COMPILE_SNIPPET = "total = sum(i * i for i in range(10000))\nprint(total)"
+
+def latency_stats(durations: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(durations),
+        "mean_ms": sum(durations) / len(durations) * 1000 if durations else 0.0,
+        "p50_ms": percentile(durations, 0.5) * 1000,
+        "p90_ms": percentile(durations, 0.9) * 1000,
+        "p99_ms": percentile(durations, 0.99) * 1000,
+        "max_ms": max(durations, default=0.0) * 1000,
+    }
+
+def bench_config(config: Dict[str, Any], workdir: str, host: str) -> Dict[str, Any]:
+    """Copy of config pointed at the fake server, with caches and logs isolated in workdir."""
+    config = dict(config)
+    config.pop("repo_index", None)
+    config.update({
+        "ollama_host": host,
+        "embedding_cache_dir": os.path.join(workdir, "embeddings"),
+        "plugin_manifest": os.path.join(workdir, "plugins.json"),
+        "response_cache": False,
+        "tracing": False,
+        "log_file": os.path.join(workdir, "codewringer.log"),
+    })
+    return config
+
+def bench_startup(config: Dict[str, Any], server: FakeOllamaServer, workdir: str, runs: int = 3) -> Dict[str, Any]:
+    """Cold (empty manifest and embedding cache) and warm ManagerAgent startup in fresh processes."""
+    config_path = os.path.join(workdir, "bench-config.json")
+    with open(config_path, "w") as f:
+        json.dump(config, f)
+
+    def start() -> Dict[str, Any]:
+        embeds = server.requests["embed"]
+        started = time.perf_counter()
+        process = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, config_path], capture_output=True, text=True, check=True)
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        result["process_s"] = time.perf_counter() - started
+        result["embed_requests"] = server.requests["embed"] - embeds
+        return result
+
+    cold = start()
+    warm = [start() for _ in range(runs)]
+    return {
+        "cold": cold,
+        "warm": min(warm, key=lambda result: result["process_s"]),
+        "warm_runs": runs,
+    }
+
+def bench_retrieval(manager, sizes: Sequence[int], queries: int = 200, limit: int = 5) -> Dict[str, Any]:
+    """find_relevant_tools_and_agents latency with the registry padded to each size with synthetic items."""
+    rag = manager.rag
+    rng = np.random.default_rng(0)
+    texts = [f"benchmark query {i}: find the right tool" for i in range(20)]
+    results, added = {}, 0
+    for size in sorted(sizes):
+        while len(rag.index) < size:
+            count = min(10000, size - len(rag.index))
+            vectors = rng.standard_normal((count, rag.index.dim), dtype=np.float32)
+            rag.add_items({
+                f"bench_{added + i}": {"type": "tool", "name": f"Bench Tool {added + i}", "description": "Synthetic benchmark entry.", "embedding": vectors[i]}
+                for i in range(count)
+            })
+            added += count
+
+        for text in texts:  # the query embeddings come from the embedding cache from here on
+            rag.find_relevant_tools_and_agents(text, limit=limit)
+        durations = []
+        for i in range(queries):
+            started = time.perf_counter()
+            rag.find_relevant_tools_and_agents(texts[i % len(texts)], limit=limit)
+            durations.append(time.perf_counter() - started)
+        results[str(size)] = dict(latency_stats(durations), items=len(rag.index))
+
+    for i in range(added):
+        rag.remove_item(f"bench_{i}")
+    return results
+
+def bench_run_task(manager, server: FakeOllamaServer, levels: Sequence[int], tasks: int) -> Dict[str, Any]:
+    """End-to-end throughput of run_task from a thread pool and of the async run_batch at each concurrency."""
+    results = {"run_task": {}, "run_batch": {}}
+    for concurrency in levels:
+        prompts = [f"bench task {concurrency}.{i}: refactor module {i}" for i in range(tasks)]
+
+        def timed(task: str) -> float:
+            started = time.perf_counter()
+            manager.run_task(task)
+            return time.perf_counter() - started
+
+        chats = server.requests["chat"]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            durations = list(pool.map(timed, prompts))
+        elapsed = time.perf_counter() - started
+        results["run_task"][str(concurrency)] = dict(
+            latency_stats(durations), seconds=elapsed, tasks_per_second=tasks / elapsed,
+            chat_requests=server.requests["chat"] - chats,
+        )
+
+        async def collect() -> List[Dict[str, Any]]:
+            entries = ({"id": i, "task": f"bench batch {concurrency}.{i}: review module {i}"} for i in range(tasks))
+            return [record async for record in manager.run_batch(entries, concurrency=concurrency)]
+
+        chats = server.requests["chat"]
+        started = time.perf_counter()
+        records = asyncio.run(collect())
+        elapsed = time.perf_counter() - started
+        results["run_batch"][str(concurrency)] = dict(
+            latency_stats([record["elapsed"] for record in records]), seconds=elapsed, tasks_per_second=tasks / elapsed,
+            chat_requests=server.requests["chat"] - chats, errors=sum("error" in record for record in records),
+        )
+    return results
+
+def bench_compile(config: Dict[str, Any], snippets: int) -> Dict[str, Any]:
+    """Compile tool latency one snippet at a time, then throughput with the sandbox pool saturated."""
+    from src.tools.compile import execute
+    from src.utils.sandbox import get_sandbox_pool
+
+    pool = get_sandbox_pool(config)
+    durations = []
+    for _ in range(20):
+        started = time.perf_counter()
+        execute(COMPILE_SNIPPET)
+        durations.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=pool.workers * 2) as executor:
+        outputs = list(executor.map(execute, [COMPILE_SNIPPET] * snippets))
+    elapsed = time.perf_counter() - started
+    return {
+        "workers": pool.workers,
+        "sequential": latency_stats(durations),
+        "snippets": snippets,
+        "seconds": elapsed,
+        "snippets_per_second": snippets / elapsed,
+        "failures": sum(not output.startswith("Output:") for output in outputs),
+    }
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(config: Dict[str, Any], sizes: Sequence[int] = (10, 1000, 100000), levels: Sequence[int] = (1, 4, 16),
+                   tasks: int = 32, snippets: int = 64, chat_latency: float = 0.05, embed_latency: float = 0.005,
+                   load_latency: float = 0.0, dim: int = 1024, startup_runs: int = 3) -> Dict[str, Any]:
+    """Run the whole suite against a local fake ollama server and return JSON-serializable results."""
+    logger = logging.getLogger("Bench")
+    parameters = {
+        "sizes": list(sizes), "concurrency": list(levels), "tasks": tasks, "snippets": snippets,
+        "chat_latency": chat_latency, "embed_latency": embed_latency, "load_latency": load_latency, "dim": dim, "startup_runs": startup_runs,
+    }
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "parameters": parameters,
+        },
+    }
+
+    with tempfile.TemporaryDirectory(prefix="codewringer-bench-") as workdir, \
+            FakeOllamaServer(chat_latency=chat_latency, embed_latency=embed_latency, load_latency=load_latency, dim=dim) as server:
+        config = bench_config(config, workdir, server.url)
+        logger.info(f"Fake ollama server at {server.url}; working in {workdir}")
+
+        logger.info("Measuring startup")
+        results["startup"] = bench_startup(config, server, workdir, runs=startup_runs)
+
+        from src.framework.manager import ManagerAgent
+        from src.framework.scheduler import get_scheduler
+
+        manager = ManagerAgent(config)
+        manager.logger.setLevel(logging.WARNING)
+        # Delegate every task to an agent so each run covers retrieval, the manager call and one sub-agent call
+        agents = sorted(item["name"] for item in manager.rag.cache.values() if item["type"] == "agent")
+        server.reply = f"Delegate this task to the {agents[0]}." if agents else "Done."
+
+        logger.info("Measuring run_task throughput")
+        results["run_task"] = bench_run_task(manager, server, levels, tasks)
+        results["models"] = get_scheduler(config).report()
+        logger.info("Measuring retrieval latency")
+        results["retrieval"] = bench_retrieval(manager, sizes)
+        logger.info("Measuring compile throughput")
+        results["compile"] = bench_compile(config, snippets)
+        manager.executor.shutdown(wait=False)
+        results["meta"]["requests"] = dict(server.requests)
+    return results
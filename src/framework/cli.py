@@ -1,5 +1,5 @@
+import json
 import click
-from src.framework.manager import ManagerAgent
 from src.utils.helpers import load_config
 
 @click.group()
@@ -9,17 +9,237 @@ def cli():
 
 @cli.command()
 @click.argument("task")
-def run(task):
+@click.option("--stream", is_flag=True, help="Print tokens as the model generates them.")
+def run(task, stream):
     """Run a task using the manager agent."""
     config = load_config("config.yaml")
     if not config:
         click.echo("Error: Failed to load config.yaml")
         return
 
+    from src.framework.manager import ManagerAgent
+
     manager = ManagerAgent(config)
+    if stream:
+        click.echo("Result: ", nl=False)
+        for token in manager.run_task_stream(task):
+            click.echo(token, nl=False)
+        click.echo()
+        return
     result = manager.run_task(task)
     click.echo(f"Result: {result}")
 
+def read_tasks(task_file):
+    """Yield {"id", "task"} entries from a JSONL file of task objects or plain task strings.
+
+    Lines that cannot be used yield {"id", "error"} instead, so one bad line fails only its own record.
+    """
+    for line_number, line in enumerate(task_file, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError as e:
+            yield {"id": line_number, "error": f"Invalid JSON on line {line_number}: {e}"}
+            continue
+        if isinstance(entry, str):
+            entry = {"task": entry}
+        if not isinstance(entry, dict):
+            yield {"id": line_number, "error": f"Line {line_number} is neither a task string nor an object"}
+            continue
+        entry.setdefault("id", line_number)
+        if not isinstance(entry.get("task"), str):
+            entry["error"] = f'Line {line_number} has no "task" string'
+        yield entry
+
+@cli.command("run-batch")
+@click.argument("task_file", type=click.File("r"))
+@click.option("--output", "-o", type=click.File("w"), default="-", help="JSONL file for results (default: stdout).")
+@click.option("--concurrency", "-c", default=4, show_default=True, help="Maximum number of tasks in flight.")
+def run_batch(task_file, output, concurrency):
+    """Run every task in a JSONL file, streaming results out as JSONL."""
+    config = load_config("config.yaml")
+    if not config:
+        click.echo("Error: Failed to load config.yaml", err=True)
+        return
+
+    import asyncio
+    from src.framework.manager import ManagerAgent
+
+    manager = ManagerAgent(config)
+
+    async def process():
+        async for record in manager.run_batch(read_tasks(task_file), concurrency=concurrency):
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+
+    asyncio.run(process())
+
+@cli.command()
+@click.argument("repo", type=click.Path(exists=True, file_okay=False))
+@click.option("--query", "-q", default=None, help="Show the chunks most relevant to this text after updating.")
+@click.option("--top-k", "-k", default=5, show_default=True, help="Number of chunks to show for --query.")
+def index(repo, query, top_k):
+    """Build or incrementally update the code index of a repository."""
+    config = load_config("config.yaml")
+    if not config:
+        click.echo("Error: Failed to load config.yaml")
+        return
+
+    from src.framework.repo_index import RepoIndex
+
+    repo_index = RepoIndex(config, repo)
+    stats = repo_index.update()
+    click.echo(f"Scanned {stats['scanned']} files: {stats['changed']} changed, {stats['removed']} removed, "
+               f"{stats['chunks_embedded']} chunks embedded, {stats['rows']} rows stored.")
+    if query:
+        for chunk in repo_index.search(query, k=top_k):
+            click.echo(f"{chunk['score']:.3f}  {chunk['path']}:{chunk['start_line']}-{chunk['end_line']}  {chunk['name']}")
+
+@cli.command()
+@click.argument("repo", default=".", type=click.Path(exists=True, file_okay=False))
+@click.option("--since", default=None, help="Analyze changes since this revision (default: the last analyzed commit).")
+@click.option("--state-file", default=None, help="Findings from earlier runs (default: <repo>/.codewringer/analysis.json).")
+@click.option("--all", "show_all", is_flag=True, help="Also print findings reused from earlier runs.")
+@click.option("--json", "as_json", is_flag=True, help="Print the full report as JSON.")
+def analyze(repo, since, state_file, show_all, as_json):
+    """Analyze only the functions changed since the last analyzed commit, reusing earlier findings."""
+    config = load_config("config.yaml")
+    if not config:
+        click.echo("Error: Failed to load config.yaml")
+        return
+
+    from subprocess import CalledProcessError
+    from src.framework.incremental import IncrementalAnalyzer
+
+    try:
+        report = IncrementalAnalyzer(config, repo, state_file).run(since)
+    except CalledProcessError as e:
+        click.echo(f"Error: git failed: {e.stderr.strip()}")
+        return
+
+    if as_json:
+        click.echo(json.dumps(report, indent=2))
+        return
+    click.echo(f"{report['files_changed']} files changed since {report['base'] or 'the first run'}: "
+               f"{len(report['touched'])} functions touched, {len(report['analyzed'])} analyzed, {report['failed']} failed.")
+    for finding in report["findings"]:
+        if finding["fresh"] or show_all:
+            label = "new" if finding["fresh"] else "reused"
+            click.echo(f"\n## {finding['path']}:{finding['start_line']}-{finding['end_line']} {finding['name']} ({label})\n{finding['finding']}")
+
+@cli.command()
+@click.argument("target")
+@click.option("--lines", is_flag=True, help="Also sample the hottest lines.")
+@click.option("--optimize", is_flag=True, help="Ask the Code Agent to optimize the measured hotspots.")
+@click.option("--verify", is_flag=True, help="Apply each suggestion to a copy, re-run it and report the measured speedup.")
+@click.option("--rounds", default=1, show_default=True, help="Optimize-and-verify rounds, each starting from the last accepted version.")
+@click.option("--save", type=click.Path(dir_okay=False), default=None, help="Write the last accepted version here.")
+def profile(target, lines, optimize, verify, rounds, save):
+    """Profile a script, a module:function entry point or inline code and rank its hotspots."""
+    config = load_config("config.yaml")
+    if not config:
+        click.echo("Error: Failed to load config.yaml")
+        return
+
+    from src.utils.profiler import make_target
+
+    target = make_target(target)
+    if not (optimize or verify):
+        from src.utils.profiler import format_report, hotspot_sources, run_target
+
+        result = run_target(config, target, line_sampling=lines)
+        click.echo(format_report(result))
+        for hotspot in hotspot_sources(result, target, limit=config.get("profile_hotspots", 5)):
+            click.echo(f"  hotspot {hotspot['path']}:{hotspot['start_line']}-{hotspot['end_line']} {hotspot['name']}: {'; '.join(hotspot['measurements'])}")
+        return
+
+    from src.framework.optimizer import ProfileGuidedOptimizer
+
+    optimizer = ProfileGuidedOptimizer(config)
+    if not verify:
+        profile = optimizer.profile(target, line_sampling=lines)
+        click.echo(profile["report"])
+        click.echo(f"\n{optimizer.suggest(profile) if profile['hotspots'] else 'No hotspots in the target code.'}")
+        return
+
+    accepted = None
+    for entry in optimizer.optimize(target, rounds=rounds, line_sampling=lines):
+        click.echo(f"== Round {entry['round']}\n{entry['report']}")
+        if "error" in entry:
+            click.echo(f"Stopped: {entry['error']}")
+            break
+        verdict = entry["verdict"]
+        click.echo(f"\n{entry['suggestion']}\n")
+        if "speedup" not in verdict:
+            click.echo(f"Not verified: {verdict['error']}")
+            continue
+        change = "speedup" if verdict["speedup"] >= 1 else "regression"
+        click.echo(f"Replaced {', '.join(verdict['replaced'])}: {verdict['baseline_s']:.4f}s -> {verdict['candidate_s']:.4f}s "
+                   f"({verdict['speedup']:.2f}x {change}, noise ±{verdict['noise']:.0%}), output {'matches' if verdict['output_matches'] else 'CHANGED'}, "
+                   f"{'accepted' if verdict['accepted'] else 'rejected'}")
+        if verdict["accepted"]:
+            accepted = verdict["candidate"]
+    if save and accepted:
+        with open(save, "w", encoding="utf-8") as f:
+            f.write(accepted["code"])
+        click.echo(f"Saved the accepted version to {save}")
+
+@cli.command()
+@click.option("--trace-file", "-t", default=None, help="JSONL trace file (default: trace_file from config.yaml).")
+def stats(trace_file):
+    """Summarize latency percentiles per stage from recorded traces."""
+    from src.utils.tracing import summarize, summarize_models
+
+    config = load_config("config.yaml") or {}
+    trace_file = trace_file or config.get("trace_file", "logs/traces.jsonl")
+    try:
+        summary = summarize(trace_file)
+    except FileNotFoundError:
+        click.echo(f"Error: No trace file at {trace_file}")
+        return
+
+    click.echo(f"{'stage':<20} {'count':>7} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} {'max ms':>10} {'prompt tok':>11} {'compl tok':>10}")
+    for name, row in sorted(summary.items(), key=lambda item: -item[1]["p50"] * item[1]["count"]):
+        click.echo(f"{name:<20} {row['count']:>7} {row['p50'] * 1000:>10.1f} {row['p90'] * 1000:>10.1f} {row['p99'] * 1000:>10.1f} "
+                   f"{row['max'] * 1000:>10.1f} {row['prompt_tokens']:>11} {row['completion_tokens']:>10}")
+
+    models = summarize_models(trace_file)
+    if models:
+        click.echo()
+        click.echo(f"{'model':<36} {'requests':>8} {'queued s':>9} {'load s':>9} {'prompt s':>9} {'gen s':>9} {'total s':>9}")
+        for model, row in sorted(models.items(), key=lambda item: -item[1]["total_s"]):
+            click.echo(f"{model:<36} {row['requests']:>8} {row['queue_wait_s']:>9.2f} {row['load_s']:>9.2f} {row['prompt_eval_s']:>9.2f} "
+                       f"{row['eval_s']:>9.2f} {row['total_s']:>9.2f}")
+
+def int_list(ctx, param, value):
+    try:
+        return [int(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise click.BadParameter("expected comma-separated integers")
+
+@cli.command()
+@click.option("--output", "-o", type=click.File("w"), default="-", help="JSON file for results (default: stdout).")
+@click.option("--sizes", default="10,1000,100000", show_default=True, callback=int_list, help="Registered item counts for the retrieval benchmark.")
+@click.option("--concurrency", "-c", default="1,4,16", show_default=True, callback=int_list, help="Concurrency levels for the run_task benchmark.")
+@click.option("--tasks", default=32, show_default=True, help="Tasks per concurrency level.")
+@click.option("--snippets", default=64, show_default=True, help="Snippets for the compile throughput benchmark.")
+@click.option("--chat-latency-ms", default=50.0, show_default=True, help="Fake server latency per chat request.")
+@click.option("--embed-latency-ms", default=5.0, show_default=True, help="Fake server latency per embed request.")
+@click.option("--load-latency-ms", default=0.0, show_default=True, help="Fake server delay when a request switches the resident model.")
+@click.option("--dim", default=1024, show_default=True, help="Dimension of the fake embeddings.")
+def bench(output, sizes, concurrency, tasks, snippets, chat_latency_ms, embed_latency_ms, load_latency_ms, dim):
+    """Benchmark startup, retrieval, orchestration and compile throughput against a local fake ollama server."""
+    from src.framework.bench import run_benchmarks
+
+    results = run_benchmarks(
+        load_config("config.yaml") or {}, sizes=sizes, levels=concurrency, tasks=tasks, snippets=snippets,
+        chat_latency=chat_latency_ms / 1000, embed_latency=embed_latency_ms / 1000,
+        load_latency=load_latency_ms / 1000, dim=dim,
+    )
+    output.write(json.dumps(results, indent=2) + "\n")
+
 @cli.command()
 def config():
     """Display the current configuration."""
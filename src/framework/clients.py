@@ -0,0 +1,23 @@
+import threading
+from typing import Any, Dict, Optional, Union
+from ollama import Client
+
+_clients: Dict[Optional[str], Client] = {}
+_clients_lock = threading.Lock()
+
+def ollama_host(config: Dict[str, Any], model: str = None) -> Optional[str]:
+    """The server for a model: its `model_hosts` entry, else `ollama_host`, else OLLAMA_HOST or the local default."""
+    return (config.get("model_hosts") or {}).get(model) or config.get("ollama_host")
+
+def keep_alive(config: Dict[str, Any], model: str) -> Optional[Union[str, float]]:
+    """How long the server should keep a model loaded: its `model_keep_alive` entry, else `keep_alive`."""
+    return (config.get("model_keep_alive") or {}).get(model, config.get("keep_alive"))
+
+def get_client(host: str = None) -> Client:
+    """Return the shared ollama Client for a host, reusing its connection pool across threads."""
+    with _clients_lock:
+        client = _clients.get(host)
+        if client is None:
+            client = Client(host=host)
+            _clients[host] = client
+        return client
@@ -1,9 +1,22 @@
-import os
-import glob
+import time
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
-from ollama import chat, embed
-from src.utils.helpers import setup_logging, cosine_similarity
+from typing import List, Dict, Any, Optional, Iterator
+from src.utils.helpers import setup_logging
+from src.framework.embedding import get_embedding_service
+from src.framework.scheduler import get_scheduler
+from src.framework.registry import PluginRegistry, PluginItem
+from src.utils.response_cache import get_response_cache
+from src.utils.vector_index import VectorIndex
+from src.utils.tracing import get_tracer, span, ollama_attributes
+
+def embed_text(config: Dict[str, Any], text: str) -> List[float]:
+    """Embed text with the configured model through the shared, batching embedding service."""
+    return get_embedding_service(config).embed(text)
+
+def embed_texts(config: Dict[str, Any], texts: List[str]) -> List[List[float]]:
+    """Embed several texts with the configured model in as few requests as possible."""
+    return get_embedding_service(config).embed_many(texts)
 
 class BaseAgent:
     def __init__(self, model_name: str, config: Dict[str, Any], name: str, description: str, system_prompt: str = None):
@@ -18,79 +31,166 @@ class BaseAgent:
     def add_tool(self, tool: Dict[str, Any]):
         self.tools.append(tool)
 
-    def call(self, prompt: str, messages: List[Dict[str, str]] = None) -> str:
+    def build_messages(self, prompt: str, messages: List[Dict[str, str]] = None) -> List[Dict[str, str]]:
         messages = messages or []
-        full_messages = [{"role": "system", "content": self.system_prompt}] + messages + [{"role": "user", "content": prompt}]
+        return [{"role": "system", "content": self.system_prompt}] + messages + [{"role": "user", "content": prompt}]
+
+    def cached_response(self, full_messages: List[Dict[str, str]], options: Optional[Dict[str, Any]], use_cache: bool):
+        """Return (cache, key, cached content) for a request; cache and key are None when bypassed."""
+        cache = get_response_cache(self.config) if use_cache else None
+        if cache is None:
+            return None, None, None
+        key = cache.make_key(self.model_name, full_messages, options)
+        return cache, key, cache.get(key)
+
+    def call(self, prompt: str, messages: List[Dict[str, str]] = None, options: Dict[str, Any] = None, use_cache: bool = True) -> str:
+        full_messages = self.build_messages(prompt, messages)
+        with span("agent.call", agent=self.name, model=self.model_name) as current:
+            try:
+                cache, key, content = self.cached_response(full_messages, options, use_cache)
+                current.set(cached=content is not None)
+                if content is None:
+                    response = get_scheduler(self.config).chat(self.config, self.model_name, full_messages, options).result()
+                    current.set(**ollama_attributes(response))
+                    content = response.get("message", {}).get("content", "").strip()
+                    if cache is not None:
+                        cache.put(key, content)
+                return f"{self.name}: {content} End of {self.name} Response"
+            except Exception as e:
+                current.status = "error"
+                current.set(error=str(e))
+                self.logger.error(f"Error in {self.name} call: {e}")
+                return f"{self.name}: Error occurred: {str(e)} End of {self.name} Response"
+
+    def call_stream(self, prompt: str, messages: List[Dict[str, str]] = None, options: Dict[str, Any] = None, use_cache: bool = True) -> Iterator[str]:
+        """Yield response tokens as the model generates them."""
+        full_messages = self.build_messages(prompt, messages)
+        tracer = get_tracer()
+        current = tracer.start_span("agent.call", agent=self.name, model=self.model_name, stream=True)
         try:
-            response = chat(model=self.model_name, messages=full_messages)
-            content = response.get("message", {}).get("content", "").strip()
-            return f"{self.name}: {content} End of {self.name} Response"
+            cache, key, content = self.cached_response(full_messages, options, use_cache)
+            current.set(cached=content is not None)
+            if content is not None:
+                yield content
+                return
+            tokens = []
+            for chunk in get_scheduler(self.config).chat_stream(self.config, self.model_name, full_messages, options):
+                token = chunk.get("message", {}).get("content", "")
+                if token:
+                    if not tokens:
+                        current.set(time_to_first_token=time.perf_counter() - current._started)
+                    tokens.append(token)
+                    yield token
+                if chunk.get("done"):
+                    current.set(**ollama_attributes(chunk))
+            if cache is not None:
+                cache.put(key, "".join(tokens).strip())
         except Exception as e:
-            self.logger.error(f"Error in {self.name} call: {e}")
-            return f"{self.name}: Error occurred: {str(e)} End of {self.name} Response"
+            current.status = "error"
+            current.set(error=str(e))
+            self.logger.error(f"Error in {self.name} streaming call: {e}")
+            yield f"{self.name}: Error occurred: {str(e)} End of {self.name} Response"
+        finally:
+            tracer.end_span(current)
+
+    async def call_async(self, prompt: str, messages: List[Dict[str, str]] = None, options: Dict[str, Any] = None, use_cache: bool = True) -> str:
+        full_messages = self.build_messages(prompt, messages)
+        with span("agent.call", agent=self.name, model=self.model_name) as current:
+            try:
+                cache, key, content = self.cached_response(full_messages, options, use_cache)
+                current.set(cached=content is not None)
+                if content is None:
+                    response = await asyncio.wrap_future(get_scheduler(self.config).chat(self.config, self.model_name, full_messages, options))
+                    current.set(**ollama_attributes(response))
+                    content = response.get("message", {}).get("content", "").strip()
+                    if cache is not None:
+                        cache.put(key, content)
+                return f"{self.name}: {content} End of {self.name} Response"
+            except Exception as e:
+                current.status = "error"
+                current.set(error=str(e))
+                self.logger.error(f"Error in {self.name} call: {e}")
+                return f"{self.name}: Error occurred: {str(e)} End of {self.name} Response"
 
     def get_embedding(self, text: str) -> List[float]:
         try:
-            response = embed(model=self.config.get("embedding_model", "bge-m3:latest"), input=text)
-            return response.get("embedding", [])
+            return embed_text(self.config, text)
         except Exception as e:
             self.logger.error(f"Error generating embedding: {e}")
             return []
 
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        try:
+            return embed_texts(self.config, texts)
+        except Exception as e:
+            self.logger.error(f"Error generating embeddings: {e}")
+            return [[] for _ in texts]
+
 class RAG:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.cache = {}  # Cache for tools and agents
+        self.index = VectorIndex()  # Normalized embeddings keyed like self.cache
         self.logger = logging.getLogger("RAG")
-        self.load_tools_and_agents()
+        with span("rag.load"):
+            self.load_tools_and_agents()
 
     def load_tools_and_agents(self):
-        # Load tools
-        tool_dir = "src/tools"
-        for tool_file in glob.glob(f"{tool_dir}/*.py"):
-            if "__init__.py" in tool_file:
-                continue
-            module_name = os.path.basename(tool_file).replace(".py", "")
-            module = __import__(f"src.tools.{module_name}", fromlist=["metadata", "execute"])
-            self.cache[f"tool_{module_name}"] = {
-                "name": module.metadata["name"],
-                "description": module.metadata["description"],
-                "embedding": self.get_embedding(module.metadata["description"]),
-                "execute": module.execute
-            }
-
-        # Load agents
-        agent_dir = "src/agents"
-        for agent_file in glob.glob(f"{agent_dir}/*.py"):
-            if "__init__.py" in agent_file:
-                continue
-            module_name = os.path.basename(agent_file).replace(".py", "")
-            module = __import__(f"src.agents.{module_name}", fromlist=["Agent"])
-            agent_instance = module.Agent(self.config)
-            self.cache[f"agent_{module_name}"] = {
-                "name": agent_instance.name,
-                "description": agent_instance.description,
-                "embedding": self.get_embedding(agent_instance.description),
-                "instance": agent_instance
-            }
+        # Metadata comes from the plugin manifest; modules are imported only when an item is used
+        entries = PluginRegistry(self.config).entries()
+
+        # Embed every description in one batched request
+        embeddings = self.get_embeddings([entry["description"] for entry in entries])
+        items = {}
+        for entry, embedding in zip(entries, embeddings):
+            items[entry["key"]] = PluginItem(entry, self.config)
+            items[entry["key"]]["embedding"] = embedding
+        self.add_items(items)
+        get_embedding_service(self.config).cache.flush()
+
+    def add_item(self, key: str, item: Dict[str, Any]):
+        """Register or replace a tool/agent entry and its embedding."""
+        self.add_items({key: item})
+
+    def add_items(self, items: Dict[str, Dict[str, Any]]):
+        """Register or replace many entries with a single index update."""
+        self.cache.update(items)
+        embedded = {key: item["embedding"] for key, item in items.items() if item.get("embedding") is not None and len(item["embedding"])}
+        for key in items.keys() - embedded.keys():
+            self.index.remove(key)
+        self.index.add_many(list(embedded), list(embedded.values()))
+
+    def remove_item(self, key: str) -> Optional[Dict[str, Any]]:
+        self.index.remove(key)
+        return self.cache.pop(key, None)
 
     def get_embedding(self, text: str) -> List[float]:
-        try:
-            response = embed(model=self.config.get("embedding_model", "bge-m3:latest"), input=text)
-            return response.get("embedding", [])
-        except Exception as e:
-            self.logger.error(f"Error in RAG embedding: {e}")
-            return []
+        with span("rag.embedding", model=self.config.get("embedding_model", "bge-m3:latest"), texts=1) as current:
+            try:
+                return embed_text(self.config, text)
+            except Exception as e:
+                current.status = "error"
+                current.set(error=str(e))
+                self.logger.error(f"Error in RAG embedding: {e}")
+                return []
 
-    def find_relevant_tools_and_agents(self, task: str, limit: int = 5) -> List[Dict[str, Any]]:
-        task_embedding = self.get_embedding(task)
-        if not task_embedding:
-            return []
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        with span("rag.embedding", model=self.config.get("embedding_model", "bge-m3:latest"), texts=len(texts)) as current:
+            try:
+                return embed_texts(self.config, texts)
+            except Exception as e:
+                current.status = "error"
+                current.set(error=str(e))
+                self.logger.error(f"Error in RAG embedding: {e}")
+                return [[] for _ in texts]
 
-        ranked_items = []
-        for item_name, item in self.cache.items():
-            similarity = cosine_similarity(task_embedding, item["embedding"])
-            ranked_items.append((similarity, item))
+    def find_relevant_tools_and_agents(self, task: str, limit: int = 5) -> List[Dict[str, Any]]:
+        with span("rag.retrieval", limit=limit, items=len(self.index)) as current:
+            task_embedding = self.get_embedding(task)
+            if not task_embedding:
+                return []
 
-        ranked_items.sort(reverse=True)
-        return [item for _, item in ranked_items[:limit]]
\ No newline at end of file
+            with span("rag.search", items=len(self.index)):
+                keys = [key for key, _ in self.index.search(task_embedding, limit)]
+            current.set(selected=[self.cache[key]["name"] for key in keys])
+            return [self.cache[key] for key in keys]
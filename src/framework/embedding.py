@@ -0,0 +1,96 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Sequence, Tuple
+from src.utils.embedding_cache import get_embedding_cache
+from src.framework.scheduler import get_scheduler
+
+class EmbeddingService:
+    """Batches embedding requests for one model in front of the on-disk embedding cache."""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.model = config.get("embedding_model", "bge-m3:latest")
+        self.max_batch_size = max(1, int(config.get("embedding_batch_size", 64)))
+        self.max_wait = float(config.get("embedding_batch_wait_ms", 5)) / 1000
+        self.cache = get_embedding_cache(config)
+        self.logger = logging.getLogger("EmbeddingService")
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def embed_many(self, texts: Sequence[str], use_cache: bool = True) -> List[List[float]]:
+        """Embed texts in as few requests as possible, skipping cached and duplicate texts."""
+        texts = list(texts)
+        results = self.cache.get_many(texts) if use_cache else [None] * len(texts)
+        missing = list(dict.fromkeys(text for text, result in zip(texts, results) if result is None))
+        if not missing:
+            return results
+
+        computed = {}
+        for start in range(0, len(missing), self.max_batch_size):
+            batch = missing[start:start + self.max_batch_size]
+            response = get_scheduler(self.config).embed(self.config, self.model, batch).result()
+            vectors = response.get("embeddings") or []
+            if len(vectors) != len(batch):
+                raise RuntimeError(f"Expected {len(batch)} embeddings from {self.model}, got {len(vectors)}")
+            computed.update((text, list(vector)) for text, vector in zip(batch, vectors))
+        self.logger.debug(f"Embedded {len(missing)} texts in {-(-len(missing) // self.max_batch_size)} requests.")
+
+        if use_cache:
+            self.cache.put_many(list(computed), list(computed.values()))
+        return [result if result is not None else computed[text] for text, result in zip(texts, results)]
+
+    def embed(self, text: str) -> List[float]:
+        """Embed a single text, coalescing concurrent callers into one batched request."""
+        cached = self.cache.get(text)
+        if cached is not None:
+            return cached
+        future: Future = Future()
+        self._queue.put((text, future))
+        self._ensure_worker()
+        return future.result()
+
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="EmbeddingService", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                vectors = self.embed_many([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+_services: Dict[tuple, EmbeddingService] = {}
+_services_lock = threading.Lock()
+
+def get_embedding_service(config: Dict[str, Any]) -> EmbeddingService:
+    """Return the process-wide embedding service for the configured embedding model."""
+    key = (os.path.abspath(config.get("embedding_cache_dir", "cache/embeddings")), config.get("embedding_model", "bge-m3:latest"))
+    with _services_lock:
+        service = _services.get(key)
+        if service is None:
+            service = EmbeddingService(config)
+            _services[key] = service
+        return service
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from src.agents.coding import CodingAgent
+from src.tools.git import GitObjectReader, diff_hunks, git
+from src.utils.code_chunks import chunk_source
+
+STATE_VERSION = 1
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def _overlaps(chunk: Dict[str, Any], lines: List[tuple]) -> bool:
+    return any(start <= chunk["end_line"] and end >= chunk["start_line"] for start, end in lines)
+
+class IncrementalAnalyzer:
+    """Analyzes only the functions a diff touches, reusing stored findings for everything else.
+
+    Findings are kept per file and chunk name in a JSON state file together with the commit they
+    describe, so the next run diffs from that commit. Blobs are read at the head revision through
+    one `git cat-file --batch` process, so the cost follows the size of the diff.
+    """
+
+    def __init__(self, config: Dict[str, Any], repo: str, state_file: str = None):
+        self.config = config
+        self.repo = str(Path(repo).resolve())
+        self.state_path = Path(state_file or config.get("analysis_state") or Path(self.repo) / ".codewringer" / "analysis.json")
+        self.workers = config.get("chunk_workers", 4)
+        self.agent = CodingAgent(config)
+        self.logger = logging.getLogger("IncrementalAnalyzer")
+
+    def load_state(self) -> Dict[str, Any]:
+        try:
+            with self.state_path.open("r") as f:
+                state = json.load(f)
+            if state.get("version") == STATE_VERSION:
+                return state
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.logger.error(f"Discarding unreadable analysis state: {e}")
+        return {"version": STATE_VERSION, "commit": None, "files": {}}
+
+    def save_state(self, state: Dict[str, Any]):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix(".tmp")
+        with tmp_path.open("w") as f:
+            json.dump(state, f, indent=1)
+        os.replace(tmp_path, self.state_path)
+
+    def changes(self, base: Optional[str], head: str) -> Dict[str, Dict[str, Any]]:
+        """Changed Python files with touched line ranges; every file counts as added when there is no base."""
+        if base:
+            return diff_hunks(self.repo, base, head)
+        self.logger.info("No previous analysis or --since revision; analyzing every Python file.")
+        paths = git(self.repo, "ls-tree", "-r", "--name-only", "-z", head).split("\0")
+        return {path: {"status": "A", "old_path": None, "lines": []} for path in paths if path.endswith(".py")}
+
+    def run(self, since: str = None) -> Dict[str, Any]:
+        """Analyze the changes from `since` (default: the last analyzed commit) to HEAD and store the results."""
+        state = self.load_state()
+        head = git(self.repo, "rev-parse", "HEAD").strip()
+        base = git(self.repo, "rev-parse", since).strip() if since else state["commit"]
+        changes = {} if base == head else self.changes(base, head)
+        files = state["files"]
+
+        targets, touched, fresh_files = [], [], {}
+        with GitObjectReader(self.repo) as reader:
+            for path, change in changes.items():
+                previous = files.pop(change["old_path"] if change["status"] == "R" else path, {})
+                if change["status"] == "D":
+                    continue
+                blob = reader.read(f"{head}:{path}")
+                if blob is None:
+                    self.logger.warning(f"Skipping {path}: not found at {head}")
+                    continue
+                entries = {}
+                # Full sources, so edits anywhere in a long function change its hash and reach the model
+                for chunk in chunk_source(blob.decode("utf-8", errors="replace"), path, max_chars=None):
+                    if _overlaps(chunk, change["lines"]):
+                        touched.append(f"{path}::{chunk['name']}")
+                    digest = _digest(chunk["text"])
+                    stored = previous.get(chunk["name"])
+                    entry = {"kind": chunk["kind"], "start_line": chunk["start_line"], "end_line": chunk["end_line"], "hash": digest}
+                    # A hunk next to a function can touch it without changing it; identical text keeps its finding
+                    if stored and stored.get("finding") and stored["hash"] == digest:
+                        entry["finding"] = stored["finding"]
+                    else:
+                        targets.append((path, chunk))
+                    entries[chunk["name"]] = entry
+                fresh_files[path] = entries
+
+        self.logger.info(f"{len(changes)} files changed between {base or 'nothing'} and {head}; analyzing {len(targets)} chunks.")
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            findings = list(executor.map(lambda target: self.agent.analyze_chunk(target[1]), targets))
+
+        analyzed, failed = [], 0
+        for (path, chunk), finding in zip(targets, findings):
+            if finding.startswith("Error occurred:"):
+                # Not stored, so the chunk is retried on the next run
+                failed += 1
+                fresh_files[path][chunk["name"]]["finding"] = None
+            else:
+                fresh_files[path][chunk["name"]]["finding"] = finding
+            analyzed.append(f"{path}::{chunk['name']}")
+
+        files.update(fresh_files)
+        # After failures, stay on the old commit so the next diff still covers the chunks that need a retry
+        state.update(commit=base if failed else head, files=files)
+        self.save_state(state)
+        fresh = set(analyzed)
+        return {
+            "base": base,
+            "head": head,
+            "files_changed": len(changes),
+            "touched": touched,
+            "analyzed": analyzed,
+            "failed": failed,
+            "findings": [
+                {"path": path, "name": name, "kind": entry["kind"], "start_line": entry["start_line"], "end_line": entry["end_line"],
+                 "finding": entry["finding"], "fresh": f"{path}::{name}" in fresh}
+                for path, entries in sorted(files.items()) for name, entry in entries.items() if entry.get("finding")
+            ],
+        }
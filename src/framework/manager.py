@@ -1,9 +1,17 @@
-from typing import Dict, Any, List
+import asyncio
+import contextvars
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, AsyncIterator, Iterable, Iterator
 from src.framework.core import BaseAgent, RAG
+from src.framework.repo_index import RepoIndex
 from src.utils.helpers import setup_logging
+from src.utils.tracing import configure_tracing, traced
 
 class ManagerAgent:
     def __init__(self, config: Dict[str, Any]):
+        configure_tracing(config)
         self.config = config
         self.model_name = config.get("manager_model", "llama3.2")
         self.rag = RAG(config)
@@ -15,36 +23,171 @@ class ManagerAgent:
             system_prompt="You are a manager agent, responsible for delegating tasks to sub-agents and tools."
         )
         self.logger = setup_logging("ManagerAgent", config.get("log_file", "logs/codewringer.log"))
+        # Blocking tools (compile, git, search) run here so they never stall the event loop
+        self.executor = ThreadPoolExecutor(max_workers=config.get("tool_workers", 4), thread_name_prefix="tool")
+        # Optional index of a repository whose most relevant functions/classes are added to prompts
+        self.repo_index = RepoIndex(config, config["repo_index"], read_only=True) if config.get("repo_index") else None
 
+    def code_context(self, task: str) -> str:
+        if self.repo_index is None:
+            return ""
+        try:
+            chunks = self.repo_index.search(task, k=self.config.get("context_chunks", 5))
+        except Exception as e:
+            self.logger.error(f"Repository index lookup failed: {e}")
+            return ""
+        self.logger.info(f"Code context: {[chunk['path'] + '::' + chunk['name'] for chunk in chunks]}")
+        return "\n\n".join(f"# {chunk['path']}:{chunk['start_line']}-{chunk['end_line']} ({chunk['name']})\n{chunk['text']}" for chunk in chunks)
+
+    def build_prompt(self, task: str, relevant_items: List[Dict[str, Any]], context: str = "") -> str:
+        tools_info = "\n".join([f"- Tool: {item['name']} - {item['description']}" for item in relevant_items if item["type"] == "tool"])
+        agents_info = "\n".join([f"- Agent: {item['name']} - {item['description']}" for item in relevant_items if item["type"] == "agent"])
+        context_info = f"Relevant Code:\n{context}\n" if context else ""
+        return f"Task: {task}\n{context_info}Available Tools:\n{tools_info}\nAvailable Agents:\n{agents_info}\nHow would you proceed?"
+
+    @staticmethod
+    def agent_task(task: str, context: str) -> str:
+        return f"{task}\n\nRelevant Code:\n{context}" if context else task
+
+    @staticmethod
+    def select_delegates(response: str, relevant_items: List[Dict[str, Any]], partial: bool = False) -> List[Dict[str, Any]]:
+        """Return the tools and agents named in the manager's response, in retrieval order.
+
+        Names must appear as whole words ("search" does not match "Research", nor "git" "digits"). With
+        partial=True the response is still streaming, so a name at its very end may be the start of a
+        longer word and is not matched yet.
+        """
+        end = r"(?=[^\w-])" if partial else r"(?![\w-])"
+        return [item for item in relevant_items
+                if re.search(rf"(?<![\w-]){re.escape(item['name'])}{end}", response, re.IGNORECASE)]
+
+    @traced("manager.run_task")
     def run_task(self, task: str) -> str:
         self.logger.info(f"Received task: {task}")
         # Find relevant tools and agents using RAG
         relevant_items = self.rag.find_relevant_tools_and_agents(task, limit=self.config.get("tool_limit", 5))
         self.logger.info(f"Relevant items: {[item['name'] for item in relevant_items]}")
-
-        # Prepare messages with available tools and agents
-        tools_info = "\n".join([f"- Tool: {item['name']} - {item['description']}" for item in relevant_items if item['name'].startswith("tool_")])
-        agents_info = "\n".join([f"- Agent: {item['name']} - {item['description']}" for item in relevant_items if item['name'].startswith("agent_")])
-        prompt = f"Task: {task}\nAvailable Tools:\n{tools_info}\nAvailable Agents:\n{agents_info}\nHow would you proceed?"
+        context = self.code_context(task)
 
         # Call the manager agent
-        response = self.agent.call(prompt)
+        response = self.agent.call(self.build_prompt(task, relevant_items, context))
         self.logger.info(f"Manager response: {response}")
 
         # Parse response to delegate tasks
-        for item in relevant_items:
-            if item["name"] in response:
-                if item["name"].startswith("tool_"):
-                    # Execute tool
-                    tool_name = item["name"].replace("tool_", "")
-                    result = item["execute"](task)
-                    self.logger.info(f"Tool {tool_name} result: {result}")
-                    return result
-                elif item["name"].startswith("agent_"):
-                    # Delegate to sub-agent
-                    sub_agent = item["instance"]
-                    result = sub_agent.call(task)
-                    self.logger.info(f"Agent {item['name']} result: {result}")
-                    return result
-
-        return response
\ No newline at end of file
+        for item in self.select_delegates(response, relevant_items):
+            if item["type"] == "tool":
+                # Execute tool
+                result = item["execute"](task)
+                self.logger.info(f"Tool {item['name']} result: {result}")
+                return result
+            elif item["type"] == "agent":
+                # Delegate to sub-agent
+                result = item["instance"].call(self.agent_task(task, context))
+                self.logger.info(f"Agent {item['name']} result: {result}")
+                return result
+
+        return response
+
+    def delegate(self, task: str, item: Dict[str, Any], context: str = "") -> str:
+        if item["type"] == "tool":
+            result = item["execute"](task)
+            self.logger.info(f"Tool {item['name']} result: {result}")
+        else:
+            result = item["instance"].call(self.agent_task(task, context))
+            self.logger.info(f"Agent {item['name']} result: {result}")
+        return result
+
+    def run_task_stream(self, task: str) -> Iterator[str]:
+        """Stream the manager's reply, starting each delegate as soon as its name appears, then stream their results."""
+        self.logger.info(f"Received task: {task}")
+        relevant_items = self.rag.find_relevant_tools_and_agents(task, limit=self.config.get("tool_limit", 5))
+        self.logger.info(f"Relevant items: {[item['name'] for item in relevant_items]}")
+        context = self.code_context(task)
+
+        response = ""
+        started = {}
+        for token in self.agent.call_stream(self.build_prompt(task, relevant_items, context)):
+            response += token
+            yield token
+            for item in self.select_delegates(response, relevant_items, partial=True):
+                if item["name"] not in started:
+                    self.logger.info(f"Delegating to {item['name']} while the manager is still responding")
+                    started[item["name"]] = self.executor.submit(contextvars.copy_context().run, self.delegate, task, item, context)
+        self.logger.info(f"Manager response: {response}")
+        for item in self.select_delegates(response, relevant_items):
+            if item["name"] not in started:
+                started[item["name"]] = self.executor.submit(contextvars.copy_context().run, self.delegate, task, item, context)
+
+        for future in as_completed(started.values()):
+            try:
+                result = future.result()
+            except Exception as e:
+                self.logger.error(f"Delegation failed: {e}")
+                result = f"Error: {str(e)}"
+            yield f"\n\n{result}"
+
+    async def delegate_async(self, task: str, item: Dict[str, Any], context: str = "") -> str:
+        if item["type"] == "tool":
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self.executor, contextvars.copy_context().run, item["execute"], task)
+            self.logger.info(f"Tool {item['name']} result: {result}")
+        else:
+            result = await item["instance"].call_async(self.agent_task(task, context))
+            self.logger.info(f"Agent {item['name']} result: {result}")
+        return result
+
+    @traced("manager.run_task")
+    async def run_task_async(self, task: str) -> str:
+        """Run a task, delegating concurrently to every tool and agent the manager selects."""
+        self.logger.info(f"Received task: {task}")
+        loop = asyncio.get_running_loop()
+        # Executor threads run in a copy of this context so their spans nest under this task
+        relevant_items = await loop.run_in_executor(
+            self.executor, contextvars.copy_context().run,
+            lambda: self.rag.find_relevant_tools_and_agents(task, limit=self.config.get("tool_limit", 5))
+        )
+        self.logger.info(f"Relevant items: {[item['name'] for item in relevant_items]}")
+        context = await loop.run_in_executor(self.executor, contextvars.copy_context().run, self.code_context, task)
+
+        response = await self.agent.call_async(self.build_prompt(task, relevant_items, context))
+        self.logger.info(f"Manager response: {response}")
+
+        delegates = self.select_delegates(response, relevant_items)
+        if not delegates:
+            return response
+
+        results = await asyncio.gather(*(self.delegate_async(task, item, context) for item in delegates), return_exceptions=True)
+        outputs = []
+        for item, result in zip(delegates, results):
+            if isinstance(result, Exception):
+                self.logger.error(f"Delegation to {item['name']} failed: {result}")
+                result = f"Error: {str(result)}"
+            outputs.append(result)
+        return outputs[0] if len(outputs) == 1 else "\n\n".join(outputs)
+
+    async def run_batch(self, tasks: Iterable[Dict[str, Any]], concurrency: int = 4) -> AsyncIterator[Dict[str, Any]]:
+        """Run tasks with at most `concurrency` in flight, yielding each result as soon as it finishes."""
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def run_one(entry: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                started = time.perf_counter()
+                record = {"id": entry.get("id")}
+                try:
+                    if "error" in entry or not isinstance(entry.get("task"), str):
+                        raise ValueError(entry.get("error") or 'Entry has no "task" string')
+                    record["task"] = entry["task"]
+                    record["result"] = await self.run_task_async(entry["task"])
+                except Exception as e:
+                    self.logger.error(f"Batch task {entry.get('id')} failed: {e}")
+                    record["error"] = str(e)
+                record["elapsed"] = round(time.perf_counter() - started, 3)
+                return record
+
+        pending = [asyncio.ensure_future(run_one(entry)) for entry in tasks]
+        try:
+            for finished in asyncio.as_completed(pending):
+                yield await finished
+        finally:
+            for future in pending:
+                future.cancel()
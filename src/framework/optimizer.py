@@ -0,0 +1,86 @@
+import ast
+import logging
+from typing import Any, Dict, List
+from src.agents.coding import CodingAgent
+from src.utils.profiler import apply_functions, format_report, hotspot_sources, run_target
+
+class ProfileGuidedOptimizer:
+    """Profiles a target, asks CodingAgent to optimize only the measured hotspots, and re-measures the change."""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.agent = CodingAgent(config)
+        self.hotspots = config.get("profile_hotspots", 5)
+        self.repeat = max(1, config.get("profile_repeat", 3))
+        self.min_speedup = config.get("profile_min_speedup", 1.02)
+        self.logger = logging.getLogger("ProfileGuidedOptimizer")
+
+    def profile(self, target: Dict[str, Any], line_sampling: bool = False) -> Dict[str, Any]:
+        result = run_target(self.config, target, line_sampling=line_sampling)
+        return {"result": result, "report": format_report(result), "hotspots": hotspot_sources(result, target, limit=self.hotspots)}
+
+    def suggest(self, profile: Dict[str, Any]) -> str:
+        return self.agent.optimize_hotspots(profile["report"], profile["hotspots"])
+
+    def compare(self, baseline: Dict[str, Any], candidate: Dict[str, Any]) -> Dict[str, Any]:
+        """Best-of-N unprofiled wall time of both targets, alternating runs so drift affects both equally.
+
+        Each measurement is a mean over repeated runs of at least profile_min_run_ms. "noise" is the larger
+        relative spread between a version's measurements; a speedup inside it is not evidence of anything.
+        """
+        baseline_times, candidate_times = [], []
+        for _ in range(self.repeat):
+            for target, times in ((baseline, baseline_times), (candidate, candidate_times)):
+                result = run_target(self.config, target, profile=False)
+                if result["returncode"] != 0 or result["cpu_time"] is None:
+                    return {"error": result["stderr"].strip().splitlines()[-1] if result["stderr"].strip() else f"exit code {result['returncode']}",
+                            "failed": "baseline" if target is baseline else "candidate"}
+                times.append((result["wall_time"], result["stdout"]))
+        baseline_best, candidate_best = min(t for t, _ in baseline_times), min(t for t, _ in candidate_times)
+        noise = max((max(t for t, _ in times) - min(t for t, _ in times)) / (min(t for t, _ in times) or 1e-9)
+                    for times in (baseline_times, candidate_times))
+        return {
+            "baseline_s": baseline_best,
+            "candidate_s": candidate_best,
+            "speedup": baseline_best / candidate_best if candidate_best else float("inf"),
+            "noise": noise,
+            "output_matches": baseline_times[0][1] == candidate_times[0][1],
+        }
+
+    def verify(self, target: Dict[str, Any], suggestion: str) -> Dict[str, Any]:
+        """Apply the suggested functions to a copy of the target and measure the speedup or regression."""
+        if "code" not in target:
+            return {"accepted": False, "error": "verification needs a script or inline code target, not an entry point"}
+        code, replaced = apply_functions(target["code"], suggestion)
+        if not replaced:
+            return {"accepted": False, "error": "the suggestion contains no replacement for a function in the target"}
+        candidate = dict(target, code=code)
+        try:
+            tree = ast.parse(code, target["filename"])
+        except SyntaxError as e:
+            return {"accepted": False, "replaced": replaced, "error": f"the patched code does not compile: {e}"}
+        if ast.dump(tree) == ast.dump(ast.parse(target["code"], target["filename"])):
+            return {"accepted": False, "replaced": replaced, "error": "the suggested functions are identical to the current code"}
+
+        verdict = dict(self.compare(target, candidate), replaced=replaced)
+        verdict["accepted"] = ("error" not in verdict and verdict["output_matches"]
+                               and verdict["speedup"] >= max(self.min_speedup, 1 + verdict["noise"]))
+        verdict["candidate"] = candidate
+        return verdict
+
+    def optimize(self, target: Dict[str, Any], rounds: int = 1, line_sampling: bool = False) -> List[Dict[str, Any]]:
+        """Profile, suggest and verify up to `rounds` times, continuing from each accepted candidate."""
+        history = []
+        for round_number in range(1, rounds + 1):
+            profile = self.profile(target, line_sampling)
+            if not profile["hotspots"]:
+                history.append({"round": round_number, "report": profile["report"], "error": "no hotspots in the target's own code"})
+                break
+            suggestion = self.suggest(profile)
+            verdict = self.verify(target, suggestion)
+            history.append({"round": round_number, "report": profile["report"], "suggestion": suggestion, "verdict": verdict})
+            self.logger.info(f"Round {round_number}: {verdict.get('speedup', 0):.2f}x, accepted={verdict['accepted']}")
+            if not verdict["accepted"]:
+                break
+            target = verdict["candidate"]
+        return history
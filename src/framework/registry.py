@@ -0,0 +1,146 @@
+import ast
+import importlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from src.utils.tracing import traced
+
+# (directory, package, plugin type) searched for tool and agent modules
+PLUGIN_DIRS = [("src/tools", "src.tools", "tool"), ("src/agents", "src.agents", "agent")]
+
+MANIFEST_VERSION = 1
+
+def _literal_metadata(tree: ast.Module) -> Optional[Dict[str, str]]:
+    """The module-level `metadata = {...}` literal of a tool module."""
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(target, ast.Name) and target.id == "metadata" for target in node.targets):
+            try:
+                return ast.literal_eval(node.value)
+            except ValueError:
+                return None
+    return None
+
+def _agent_metadata(tree: ast.Module) -> Optional[Dict[str, str]]:
+    """The constant name/description an `Agent` class passes to BaseAgent.__init__."""
+    classes = {node.name: node for node in tree.body if isinstance(node, ast.ClassDef)}
+    agent_class = classes.get("Agent")
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(target, ast.Name) and target.id == "Agent" for target in node.targets):
+            if isinstance(node.value, ast.Name):
+                agent_class = classes.get(node.value.id)
+    if agent_class is None:
+        return None
+
+    for node in ast.walk(agent_class):
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "__init__"
+                and isinstance(node.func.value, ast.Call) and getattr(node.func.value.func, "id", None) == "super"):
+            keywords = {keyword.arg: keyword.value for keyword in node.keywords}
+            try:
+                return {"name": ast.literal_eval(keywords["name"]), "description": ast.literal_eval(keywords["description"])}
+            except (KeyError, ValueError):
+                return None
+    return None
+
+class PluginRegistry:
+    """Tool and agent metadata read from source without importing it, cached in a manifest file."""
+
+    def __init__(self, config: Dict[str, Any], plugin_dirs: List[tuple] = None):
+        self.config = config
+        self.plugin_dirs = plugin_dirs or PLUGIN_DIRS
+        self.manifest_path = Path(config.get("plugin_manifest", "cache/plugins.json"))
+        self.logger = logging.getLogger("PluginRegistry")
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with self.manifest_path.open("r") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == MANIFEST_VERSION:
+                return manifest
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.logger.error(f"Discarding unreadable plugin manifest: {e}")
+        return {"version": MANIFEST_VERSION, "files": {}}
+
+    def _save_manifest(self, manifest: Dict[str, Any]):
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with tmp_path.open("w") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _describe(self, path: Path, package: str, plugin_type: str) -> Optional[Dict[str, str]]:
+        module_name = path.stem
+        try:
+            tree = ast.parse(path.read_text(encoding="utf-8"))
+            metadata = _literal_metadata(tree) if plugin_type == "tool" else _agent_metadata(tree)
+        except (OSError, SyntaxError) as e:
+            self.logger.error(f"Cannot read plugin {path}: {e}")
+            return None
+
+        if metadata is None:
+            # Not statically readable: import once to describe it; the result is still cached
+            self.logger.info(f"Importing {package}.{module_name} to read its metadata")
+            module = importlib.import_module(f"{package}.{module_name}")
+            if plugin_type == "tool":
+                metadata = module.metadata
+            else:
+                instance = module.Agent(self.config)
+                metadata = {"name": instance.name, "description": instance.description}
+
+        return {
+            "key": f"{plugin_type}_{module_name}",
+            "type": plugin_type,
+            "name": metadata["name"],
+            "description": metadata["description"],
+            "entry_point": f"{package}.{module_name}:{'execute' if plugin_type == 'tool' else 'Agent'}",
+        }
+
+    def entries(self) -> List[Dict[str, str]]:
+        """Return plugin entries, re-reading only files whose mtime or size changed."""
+        manifest = self._load_manifest()
+        files, dirty = {}, False
+        for directory, package, plugin_type in self.plugin_dirs:
+            if not os.path.isdir(directory):
+                continue
+            for filename in sorted(os.listdir(directory)):
+                if not filename.endswith(".py") or filename.startswith("_"):
+                    continue
+                path = Path(directory) / filename
+                stat = path.stat()
+                cached = manifest["files"].get(str(path))
+                if cached and cached["mtime"] == stat.st_mtime and cached["size"] == stat.st_size:
+                    files[str(path)] = cached
+                    continue
+                entry = self._describe(path, package, plugin_type)
+                files[str(path)] = {"mtime": stat.st_mtime, "size": stat.st_size, "entry": entry}
+                dirty = True
+
+        if dirty or set(files) != set(manifest["files"]):
+            self._save_manifest({"version": MANIFEST_VERSION, "files": files})
+        return [record["entry"] for record in files.values() if record["entry"]]
+
+def load_entry_point(entry_point: str) -> Any:
+    module_name, attribute = entry_point.split(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+class PluginItem(dict):
+    """RAG entry whose `execute` or `instance` is imported/instantiated on first access."""
+
+    _lock = threading.Lock()
+
+    def __init__(self, entry: Dict[str, str], config: Dict[str, Any]):
+        super().__init__(entry)
+        self.config = config
+
+    def __missing__(self, key: str) -> Any:
+        if (key == "execute" and self["type"] == "tool") or (key == "instance" and self["type"] == "agent"):
+            with self._lock:
+                if key not in self:
+                    target = load_entry_point(self["entry_point"])
+                    self[key] = traced("tool.execute", tool=self["name"])(target) if key == "execute" else target(self.config)
+                return dict.__getitem__(self, key)
+        raise KeyError(key)
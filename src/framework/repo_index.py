@@ -0,0 +1,426 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+import numpy as np
+from src.framework.embedding import get_embedding_service
+from src.utils.code_chunks import chunk_source
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, so only one process may use an index at a time
+    fcntl = None
+
+SKIP_DIRS = {
+    ".git", ".hg", ".svn", "__pycache__", ".venv", "venv", "node_modules", ".tox", ".nox",
+    ".mypy_cache", ".pytest_cache", ".ruff_cache", ".codewringer", "build", "dist",
+}
+
+DEAD = -1  # assignment of a row whose chunk was deleted or replaced
+
+class RepoIndex:
+    """Incremental on-disk vector index of the functions and classes in a repository.
+
+    Vectors live in an append-only float32 file that is memory-mapped for queries; chunk
+    metadata and per-file content hashes live in SQLite. Once the index is large enough,
+    rows are grouped into inverted lists around k-means centroids so a query only scores
+    the rows in the few lists nearest to it.
+
+    One process at a time updates the index (update.lock). Updates change the files only while holding
+    data.lock exclusively and searches read them under a shared data.lock, reloading whatever changed,
+    so a search never pairs rows with the wrong vectors. Open with read_only=True to only search.
+    """
+
+    def __init__(self, config: Dict[str, Any], root: str, index_dir: str = None, read_only: bool = False):
+        self.config = config
+        self.root = Path(root).resolve()
+        self.index_dir = Path(index_dir or config.get("index_dir") or self.root / ".codewringer" / "index")
+        self.model = config.get("embedding_model", "bge-m3:latest")
+        self.embeddings = get_embedding_service(config)
+        self.nprobe = config.get("index_nprobe", 8)
+        self.brute_force_rows = config.get("index_brute_force_rows", 20000)
+        self.logger = logging.getLogger("RepoIndex")
+        self._lock = threading.RLock()
+
+        self.read_only = read_only
+        self.meta_path = self.index_dir / "meta.json"
+        self.vectors_path = self.index_dir / "vectors.f32"
+        self.assignments_path = self.index_dir / "assignments.i32"
+        self.centroids_path = self.index_dir / "centroids.f32"
+        db_path = self.index_dir / "index.sqlite"
+
+        self._meta = {"model": self.model, "dim": 0, "trained_rows": 0}
+        self._vectors: Optional[np.memmap] = None
+        self._assignments: Optional[np.ndarray] = None
+        self._centroids: Optional[np.ndarray] = None
+        self._lists = None
+        self._loaded = None  # stamps of the files behind the in-memory state
+        if read_only:
+            self._db = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False) if db_path.exists() else None
+            return
+
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, hash TEXT NOT NULL, mtime REAL NOT NULL, size INTEGER NOT NULL)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS chunks (row INTEGER PRIMARY KEY, path TEXT NOT NULL, name TEXT NOT NULL, "
+            "kind TEXT NOT NULL, start_line INTEGER NOT NULL, end_line INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS chunks_path ON chunks (path)")
+        self._db.commit()
+
+    # -- storage -----------------------------------------------------------------
+
+    def _load_meta(self) -> Dict[str, Any]:
+        meta = {"model": self.model, "dim": 0, "trained_rows": 0}
+        if self.meta_path.exists():
+            with self.meta_path.open("r") as f:
+                stored = json.load(f)
+            if stored.get("model") == self.model:
+                return stored
+            if self.read_only:
+                self.logger.warning(f"Index was built with {stored.get('model')}, not {self.model}; run `index` to rebuild it.")
+                return meta
+            self.logger.info(f"Embedding model changed from {stored.get('model')} to {self.model}; rebuilding index.")
+            self._clear_storage()
+        return meta
+
+    def _clear_storage(self):
+        for path in (self.vectors_path, self.assignments_path, self.centroids_path, self.meta_path):
+            if path.exists():
+                path.unlink()
+        self._db.execute("DELETE FROM files")
+        self._db.execute("DELETE FROM chunks")
+        self._db.commit()
+
+    @contextlib.contextmanager
+    def _locked(self, name: str, exclusive: bool):
+        """Cross-process lock on a file in the index directory."""
+        if fcntl is None or not self.index_dir.exists():
+            yield
+            return
+        with open(self.index_dir / name, "a+b") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _stamp(path: Path) -> Optional[tuple]:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def _refresh(self):
+        """Reload the saved state if it changed since it was last read; callers hold data.lock."""
+        stamps = tuple(self._stamp(path) for path in (self.meta_path, self.assignments_path, self.centroids_path))
+        if stamps == self._loaded:
+            return
+        self._meta = self._load_meta()
+        self._assignments = self._load_array(self.assignments_path, np.int32)
+        self._centroids = self._load_array(self.centroids_path, np.float32)
+        if not self._meta["dim"]:
+            self._assignments = self._centroids = None
+        elif self._centroids is not None:
+            self._centroids = self._centroids.reshape(-1, self._meta["dim"])
+        self._vectors = None
+        self._lists = None
+        self._loaded = tuple(self._stamp(path) for path in (self.meta_path, self.assignments_path, self.centroids_path))
+
+    def _recover(self):
+        """Drop what an interrupted update left behind its last saved batch: vectors past row_count
+        and rows whose chunk metadata was never committed."""
+        row_bytes = 4 * self._meta["dim"]
+        if row_bytes and self.vectors_path.exists() and self.vectors_path.stat().st_size > self.row_count * row_bytes:
+            os.truncate(self.vectors_path, self.row_count * row_bytes)
+        if self.row_count:
+            known = np.zeros(self.row_count, dtype=bool)
+            known[[row for (row,) in self._db.execute("SELECT row FROM chunks WHERE row < ?", (self.row_count,))]] = True
+            orphans = ~known & (self._assignments != DEAD)
+            if orphans.any():
+                self._assignments[orphans] = DEAD
+                self._save_array(self._assignments, self.assignments_path)
+
+    @staticmethod
+    def _load_array(path: Path, dtype) -> Optional[np.ndarray]:
+        return np.fromfile(path, dtype=dtype) if path.exists() else None
+
+    def _save_meta(self):
+        tmp_path = self.meta_path.with_suffix(".tmp")
+        with tmp_path.open("w") as f:
+            json.dump(self._meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def _save_array(self, array: np.ndarray, path: Path):
+        tmp_path = path.with_suffix(".tmp")
+        array.tofile(tmp_path)
+        os.replace(tmp_path, path)
+
+    def _mark_saved(self):
+        """Record the files just written by this process as the loaded state."""
+        self._loaded = tuple(self._stamp(path) for path in (self.meta_path, self.assignments_path, self.centroids_path))
+
+    @property
+    def row_count(self) -> int:
+        return 0 if self._assignments is None else len(self._assignments)
+
+    def _view(self) -> Optional[np.ndarray]:
+        if not self.row_count:
+            return None
+        if self._vectors is None or self._vectors.shape[0] != self.row_count:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self.row_count, self._meta["dim"]))
+        return self._vectors
+
+    # -- indexing ----------------------------------------------------------------
+
+    def iter_files(self) -> Iterator[Path]:
+        for directory, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [name for name in dirnames if name not in SKIP_DIRS and not name.startswith(".")]
+            for filename in filenames:
+                if filename.endswith(".py"):
+                    yield Path(directory) / filename
+
+    def update(self, batch_files: int = 256) -> Dict[str, int]:
+        """Re-embed only files whose content changed since the last update."""
+        if self.read_only:
+            raise RuntimeError("RepoIndex was opened read-only")
+        with self._lock, self._locked("update.lock", exclusive=True):
+            with self._locked("data.lock", exclusive=True):
+                self._refresh()
+                self._recover()
+                self._mark_saved()
+            known = {path: (digest, mtime, size) for path, digest, mtime, size in self._db.execute("SELECT path, hash, mtime, size FROM files")}
+            stats = {"scanned": 0, "changed": 0, "removed": 0, "chunks_embedded": 0}
+            seen, changed = set(), []
+
+            try:
+                for path in self.iter_files():
+                    relative = path.relative_to(self.root).as_posix()
+                    seen.add(relative)
+                    stats["scanned"] += 1
+                    try:
+                        stat = path.stat()
+                        record = known.get(relative)
+                        if record and record[1] == stat.st_mtime and record[2] == stat.st_size:
+                            continue
+                        data = path.read_bytes()
+                    except OSError as e:
+                        self.logger.error(f"Skipping unreadable file {relative}: {e}")
+                        continue
+                    digest = hashlib.sha256(data).hexdigest()
+                    if record and record[0] == digest:
+                        self._db.execute("UPDATE files SET mtime = ?, size = ? WHERE path = ?", (stat.st_mtime, stat.st_size, relative))
+                        continue
+                    changed.append((relative, data, digest, stat))
+                    stats["changed"] += 1
+                    if len(changed) >= batch_files:
+                        stats["chunks_embedded"] += self._index_files(changed)
+                        changed = []
+                if changed:
+                    stats["chunks_embedded"] += self._index_files(changed)
+
+                removed = set(known) - seen
+                with self._locked("data.lock", exclusive=True):
+                    for relative in removed:
+                        self._drop_file(relative)
+                        self._db.execute("DELETE FROM files WHERE path = ?", (relative,))
+                    stats["removed"] = len(removed)
+                    if self._assignments is not None:
+                        self._save_array(self._assignments, self.assignments_path)
+                    self._db.commit()
+                    self._mark_saved()
+            except Exception:
+                # Saved batches stay; the failed batch's files keep their old hashes and are re-embedded next time
+                self._db.rollback()
+                self._loaded = None
+                with self._locked("data.lock", exclusive=False):
+                    self._refresh()
+                raise
+
+            with self._locked("data.lock", exclusive=True):
+                if self._assignments is not None:
+                    live = int(np.count_nonzero(self._assignments != DEAD))
+                    if self.row_count - live > max(1024, live // 4):
+                        self._compact()
+                    if live >= self.brute_force_rows and (self._centroids is None or live > 2 * self._meta["trained_rows"]):
+                        self._train()
+                    self._save_array(self._assignments, self.assignments_path)
+                self._save_meta()
+                self._mark_saved()
+            self._lists = None
+            stats["rows"] = self.row_count
+            self.logger.info(f"Index update: {stats}")
+            return stats
+
+    def _drop_file(self, relative: str):
+        rows = [row for (row,) in self._db.execute("SELECT row FROM chunks WHERE path = ?", (relative,))]
+        if rows and self._assignments is not None:
+            self._assignments[rows] = DEAD
+        self._db.execute("DELETE FROM chunks WHERE path = ?", (relative,))
+
+    def _index_files(self, files) -> int:
+        chunks = []
+        for relative, data, digest, stat in files:
+            self._drop_file(relative)
+            chunks.extend(chunk_source(data.decode("utf-8", errors="replace"), relative))
+
+        matrix = None
+        if chunks:
+            # Index vectors are stored here, so bypass the shared embedding cache
+            vectors = self.embeddings.embed_many([chunk["text"] for chunk in chunks], use_cache=False)
+            matrix = np.asarray(vectors, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix /= norms
+            if not self._meta["dim"]:
+                self._meta["dim"] = matrix.shape[1]
+            elif matrix.shape[1] != self._meta["dim"]:
+                raise ValueError(f"Embedding dimension {matrix.shape[1]} does not match index dimension {self._meta['dim']}")
+
+        # Save the batch as a unit (vectors, then assignments, then metadata) so a later failure cannot misalign them
+        with self._locked("data.lock", exclusive=True):
+            if matrix is not None:
+                # Write at row_count rather than the end of the file, which may hold rows of a failed batch
+                first_row = self.row_count
+                row_bytes = 4 * self._meta["dim"]
+                self._vectors = None
+                fd = os.open(self.vectors_path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    os.ftruncate(fd, first_row * row_bytes)
+                    os.pwrite(fd, matrix.tobytes(), first_row * row_bytes)
+                finally:
+                    os.close(fd)
+                assignments = self._assign(matrix) if self._centroids is not None else np.zeros(len(chunks), dtype=np.int32)
+                self._assignments = assignments if self._assignments is None else np.concatenate([self._assignments, assignments])
+                self._db.executemany(
+                    "INSERT INTO chunks (row, path, name, kind, start_line, end_line) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(first_row + i, chunk["path"], chunk["name"], chunk["kind"], chunk["start_line"], chunk["end_line"]) for i, chunk in enumerate(chunks)],
+                )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO files (path, hash, mtime, size) VALUES (?, ?, ?, ?)",
+                [(relative, digest, stat.st_mtime, stat.st_size) for relative, _, digest, stat in files],
+            )
+            if self._assignments is not None:
+                self._save_array(self._assignments, self.assignments_path)
+            self._save_meta()
+            self._db.commit()
+            self._mark_saved()
+        return len(chunks)
+
+    def _compact(self):
+        """Rewrite the vector file without dead rows and renumber chunk rows to match."""
+        live_rows = np.flatnonzero(self._assignments != DEAD)
+        view = self._view()
+        tmp_path = self.vectors_path.with_suffix(".tmp")
+        with tmp_path.open("wb") as f:
+            for start in range(0, len(live_rows), 65536):
+                f.write(np.asarray(view[live_rows[start:start + 65536]], dtype=np.float32).tobytes())
+        self._vectors = None
+        del view
+        os.replace(tmp_path, self.vectors_path)
+
+        self._db.execute("CREATE TEMP TABLE row_map (old INTEGER PRIMARY KEY, new INTEGER NOT NULL)")
+        self._db.executemany("INSERT INTO row_map (old, new) VALUES (?, ?)", ((int(old), new) for new, old in enumerate(live_rows)))
+        self._db.execute("UPDATE chunks SET row = -1 - (SELECT new FROM row_map WHERE old = chunks.row)")
+        self._db.execute("UPDATE chunks SET row = -1 - row")
+        self._db.execute("DROP TABLE row_map")
+        self._db.commit()
+        self._assignments = self._assignments[live_rows]
+        self._save_array(self._assignments, self.assignments_path)
+        self.logger.info(f"Compacted index to {len(live_rows)} rows.")
+
+    def _assign(self, matrix: np.ndarray) -> np.ndarray:
+        labels = [np.argmax(matrix[start:start + 65536] @ self._centroids.T, axis=1) for start in range(0, len(matrix), 65536)]
+        return np.concatenate(labels).astype(np.int32) if labels else np.zeros(0, dtype=np.int32)
+
+    def _train(self, iterations: int = 10, sample_size: int = 50000):
+        """Fit spherical k-means centroids on a sample and reassign every live row."""
+        live_rows = np.flatnonzero(self._assignments != DEAD)
+        rng = np.random.default_rng(0)
+        sample = np.sort(rng.choice(live_rows, min(len(live_rows), sample_size), replace=False))
+        view = self._view()
+        points = np.asarray(view[sample], dtype=np.float32)
+        nlist = int(min(4096, max(1, np.sqrt(len(live_rows)))))
+        centroids = points[rng.choice(len(points), nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            labels = np.argmax(points @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, points)
+            counts = np.bincount(labels, minlength=nlist)
+            nonempty = counts > 0
+            centroids[nonempty] = sums[nonempty]
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+
+        self._centroids = centroids
+        for start in range(0, len(live_rows), 65536):
+            rows = live_rows[start:start + 65536]
+            self._assignments[rows] = self._assign(np.asarray(view[rows], dtype=np.float32))
+        self._save_array(centroids, self.centroids_path)
+        self._meta["trained_rows"] = len(live_rows)
+        self.logger.info(f"Trained {nlist} inverted lists over {len(live_rows)} rows.")
+
+    # -- querying ----------------------------------------------------------------
+
+    def _candidates(self, query: np.ndarray) -> np.ndarray:
+        live = self._assignments != DEAD
+        if self._centroids is None or np.count_nonzero(live) < self.brute_force_rows:
+            return np.flatnonzero(live)
+        if self._lists is None:
+            order = np.argsort(self._assignments, kind="stable")
+            bounds = np.searchsorted(self._assignments[order], np.arange(len(self._centroids) + 1))
+            self._lists = (order, bounds)
+        order, bounds = self._lists
+        probes = np.argsort(-(self._centroids @ query))[:self.nprobe]
+        return np.sort(np.concatenate([order[bounds[p]:bounds[p + 1]] for p in probes]))
+
+    def search(self, text: str, k: int = 5) -> List[Dict[str, Any]]:
+        """Return the k chunks most similar to text, with their source."""
+        if self._db is None:
+            return []
+        query = np.asarray(self.embeddings.embed(text), dtype=np.float32)
+        with self._lock, self._locked("data.lock", exclusive=False):
+            self._refresh()
+            view = self._view()
+            if view is None or query.shape[0] != self._meta["dim"]:
+                return []
+            query /= max(float(np.linalg.norm(query)), 1e-12)
+
+            candidates = self._candidates(query)
+            if not len(candidates):
+                return []
+            scores = np.asarray(view[candidates]) @ query
+            k = min(k, len(candidates))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+
+            results = []
+            for position in top:
+                row = self._db.execute(
+                    "SELECT path, name, kind, start_line, end_line FROM chunks WHERE row = ?", (int(candidates[position]),)
+                ).fetchone()
+                if row is None:
+                    continue
+                path, name, kind, start_line, end_line = row
+                results.append({
+                    "path": path, "name": name, "kind": kind, "start_line": start_line, "end_line": end_line,
+                    "score": float(scores[position]), "text": self.read_chunk(path, start_line, end_line),
+                })
+            return results
+
+    def read_chunk(self, path: str, start_line: int, end_line: int) -> str:
+        try:
+            with (self.root / path).open("r", encoding="utf-8", errors="replace") as f:
+                return "".join(islice(f, start_line - 1, end_line))
+        except OSError:
+            return ""
@@ -0,0 +1,226 @@
+import contextvars
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from ollama import Client
+from src.framework.clients import get_client, keep_alive, ollama_host
+from src.utils.tracing import span, ollama_attributes
+
+# A response whose load_duration exceeds this (seconds) is counted as a model (re)load
+RELOAD_THRESHOLD = 0.25
+
+class _Job:
+    __slots__ = ("model", "run", "interactive", "future", "context", "queued")
+
+    def __init__(self, model: str, run: Callable[[Client], Any], interactive: bool = False):
+        self.model = model
+        self.run = run
+        self.interactive = interactive
+        self.future = Future()
+        self.context = contextvars.copy_context()
+        self.queued = time.monotonic()
+
+class _HostQueue:
+    """Requests for one ollama host, served one model at a time.
+
+    With drain on, a different model is only requested once the active model's requests finished, so
+    a server that fits one model never swaps weights mid-batch. Interactive requests skip the queue
+    and are not waited for: a user watching a stream should not wait for a batch, nor hold one up.
+    """
+
+    def __init__(self, scheduler: "ModelScheduler", host: Optional[str]):
+        self.scheduler = scheduler
+        self.host = host
+        self.client = get_client(host)
+        self.drain = scheduler.drain_hosts.get(host, scheduler.drain)
+        self.pending: Dict[str, deque] = {}
+        self.interactive: deque = deque()
+        self.active = None
+        self.served = 0  # requests taken for the active model since it became active
+        self.in_flight = 0  # queued (not interactive) requests running
+        self.switches = 0
+        self.condition = threading.Condition()
+        self.threads = [
+            threading.Thread(target=self._work, name=f"model-scheduler-{host or 'default'}", daemon=True)
+            for _ in range(scheduler.parallel)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def put(self, job: _Job):
+        with self.condition:
+            if job.interactive:
+                self.interactive.append(job)
+            else:
+                self.pending.setdefault(job.model, deque()).append(job)
+            self.condition.notify()
+
+    def _next(self) -> Optional[_Job]:
+        if self.interactive:
+            return self.interactive.popleft()
+        others = any(model != self.active for model in self.pending)
+        if self.active in self.pending and (self.served < self.scheduler.max_batch or not others):
+            return self._take(self.active)
+        if (self.in_flight and self.drain) or not self.pending:
+            # Let the loaded model drain before another one is requested
+            return None
+        candidates = [model for model in self.pending if model != self.active] or list(self.pending)
+        # Most queued requests first to amortize the load; the oldest request breaks ties
+        model = max(candidates, key=lambda name: (len(self.pending[name]), -self.pending[name][0].queued))
+        if model != self.active:
+            if self.active is not None:
+                self.switches += 1
+            self.active, self.served = model, 0
+        return self._take(model)
+
+    def _take(self, model: str) -> _Job:
+        jobs = self.pending[model]
+        job = jobs.popleft()
+        if not jobs:
+            del self.pending[model]
+        self.served += 1
+        self.in_flight += 1
+        return job
+
+    def _work(self):
+        while True:
+            with self.condition:
+                job = self._next()
+                while job is None:
+                    self.condition.wait()
+                    job = self._next()
+            try:
+                job.context.run(self.scheduler._execute, self, job)
+            finally:
+                with self.condition:
+                    if not job.interactive:
+                        self.in_flight -= 1
+                    self.condition.notify_all()
+
+class ModelScheduler:
+    """Queues chat and embedding requests per host and model so one model's requests finish before the next loads.
+
+    drain_hosts overrides drain for single hosts, e.g. off for a server with memory for several models.
+    """
+
+    def __init__(self, parallel: int = 4, max_batch: int = 64, drain: bool = True, drain_hosts: Dict[Optional[str], bool] = None):
+        self.parallel = max(1, parallel)
+        self.max_batch = max(1, max_batch)
+        self.drain = drain
+        self.drain_hosts = dict(drain_hosts or {})
+        self.logger = logging.getLogger("ModelScheduler")
+        self._hosts: Dict[Optional[str], _HostQueue] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def submit(self, host: Optional[str], model: str, run: Callable[[Client], Any], interactive: bool = False) -> Future:
+        """Queue run(client) for a model on a host; the future resolves to its return value.
+
+        Interactive requests start as soon as a slot is free, alongside whatever model is active.
+        """
+        with self._lock:
+            host_queue = self._hosts.get(host)
+            if host_queue is None:
+                host_queue = _HostQueue(self, host)
+                self._hosts[host] = host_queue
+        job = _Job(model, run, interactive)
+        host_queue.put(job)
+        return job.future
+
+    def _execute(self, host_queue: _HostQueue, job: _Job):
+        if not job.future.set_running_or_notify_cancel():
+            return
+        queue_wait = time.monotonic() - job.queued
+        with span("model.request", model=job.model, host=host_queue.host, queue_wait=queue_wait) as current:
+            try:
+                response = job.run(host_queue.client)
+            except BaseException as e:
+                self._record(job.model, queue_wait, None)
+                current.status = "error"
+                current.set(error=str(e))
+                job.future.set_exception(e)
+                return
+            attributes = ollama_attributes(response)
+            current.set(**attributes)
+            self._record(job.model, queue_wait, attributes)
+        job.future.set_result(response)
+
+    def _record(self, model: str, queue_wait: float, attributes: Optional[Dict[str, Any]]):
+        with self._lock:
+            stats = self._stats.setdefault(model, {
+                "requests": 0, "errors": 0, "reloads": 0, "queue_wait_s": 0.0,
+                "load_s": 0.0, "prompt_eval_s": 0.0, "eval_s": 0.0, "total_s": 0.0,
+            })
+            stats["requests"] += 1
+            stats["queue_wait_s"] += queue_wait
+            if attributes is None:
+                stats["errors"] += 1
+                return
+            for key in ("load", "prompt_eval", "eval", "total"):
+                stats[f"{key}_s"] += attributes.get(f"{key}_duration", 0.0)
+            if attributes.get("load_duration", 0.0) > RELOAD_THRESHOLD:
+                stats["reloads"] += 1
+                self.logger.info(f"{model} took {attributes['load_duration']:.2f}s to load")
+
+    def report(self) -> Dict[str, Any]:
+        """Per-model time spent queued, loading, reading the prompt and generating, and model switches per host."""
+        with self._lock:
+            return {
+                "models": {model: dict(stats) for model, stats in self._stats.items()},
+                "hosts": {host or "default": {"switches": host_queue.switches} for host, host_queue in self._hosts.items()},
+            }
+
+    def chat(self, config: Dict[str, Any], model: str, messages: List[Dict[str, str]], options: Dict[str, Any] = None) -> Future:
+        alive = keep_alive(config, model)
+        return self.submit(ollama_host(config, model), model,
+                           lambda client: client.chat(model=model, messages=messages, options=options, keep_alive=alive))
+
+    def chat_stream(self, config: Dict[str, Any], model: str, messages: List[Dict[str, str]], options: Dict[str, Any] = None) -> Iterator[Dict[str, Any]]:
+        """Yield chat chunks as they arrive; the request holds its slot until the last chunk.
+
+        Streams are interactive: they neither wait for nor block the queued requests of other models.
+        """
+        alive = keep_alive(config, model)
+        chunks: "queue.Queue" = queue.Queue()
+
+        def run(client: Client):
+            last = None
+            try:
+                for chunk in client.chat(model=model, messages=messages, options=options, keep_alive=alive, stream=True):
+                    chunks.put(chunk)
+                    last = chunk
+            finally:
+                chunks.put(None)
+            return last
+
+        future = self.submit(ollama_host(config, model), model, run, interactive=True)
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                break
+            yield chunk
+        future.result()
+
+    def embed(self, config: Dict[str, Any], model: str, texts: List[str]) -> Future:
+        alive = keep_alive(config, model)
+        return self.submit(ollama_host(config, model), model, lambda client: client.embed(model=model, input=texts, keep_alive=alive))
+
+_scheduler: Optional[ModelScheduler] = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler(config: Dict[str, Any]) -> ModelScheduler:
+    """Return the process-wide model scheduler, creating it from config on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ModelScheduler(
+                parallel=config.get("scheduler_parallel", 4),
+                max_batch=config.get("scheduler_max_batch", 64),
+                drain=config.get("scheduler_drain", True),
+                drain_hosts=config.get("scheduler_drain_hosts"),
+            )
+        return _scheduler
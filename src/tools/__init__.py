@@ -1,4 +1,14 @@
-from .git import metadata as git_metadata, execute as git_execute
-from .compile import metadata as compile_metadata, execute as compile_execute
-from .search import metadata as search_metadata, execute as search_execute
-from .embed import metadata as embed_metadata, execute as embed_execute
\ No newline at end of file
+import importlib
+
+# Tools are imported on first access; RAG reads their metadata from the plugin manifest instead
+_EXPORTS = {
+    f"{tool}_{attribute}": (f".{tool}", attribute)
+    for tool in ("git", "compile", "search", "embed", "profile")
+    for attribute in ("metadata", "execute")
+}
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        module_name, attribute = _EXPORTS[name]
+        return getattr(importlib.import_module(module_name, __name__), attribute)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,7 +1,6 @@
-import subprocess
 import logging
-import tempfile
-import os
+from src.utils.helpers import load_config
+from src.utils.sandbox import get_sandbox_pool
 
 metadata = {
     "name": "compile",
@@ -11,21 +10,19 @@ metadata = {
 def execute(task: str) -> str:
     logger = logging.getLogger("CompileTool")
     try:
-        # Write code to a temporary file
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False) as f:
-            f.write(task)
-            temp_file = f.name
+        # Run the code in a sandboxed child forked from a warm interpreter
+        result = get_sandbox_pool(load_config("config.yaml") or {}).run(task)
+        stats = f"[wall {result['wall_time']:.3f}s"
+        if result["cpu_time"] is not None:
+            stats += f", cpu {result['cpu_time']:.3f}s, peak RSS {result['peak_rss_kb'] / 1024:.1f} MiB"
+        stats += "]"
 
-        # Run the code
-        result = subprocess.run(["python", temp_file], capture_output=True, text=True)
-        os.remove(temp_file)
-
-        if result.returncode == 0:
-            logger.info("Code executed successfully.")
-            return f"Output:\n{result.stdout}"
+        if result["returncode"] == 0:
+            logger.info(f"Code executed successfully. {stats}")
+            return f"Output:\n{result['stdout']}\n{stats}"
         else:
-            logger.error(f"Code execution failed: {result.stderr}")
-            return f"Error:\n{result.stderr}"
+            logger.error(f"Code execution failed: {result['stderr']}")
+            return f"Error:\n{result['stderr']}\n{stats}"
     except Exception as e:
         logger.error(f"Compile tool error: {e}")
-        return f"Error: {str(e)}"
\ No newline at end of file
+        return f"Error: {str(e)}"
@@ -1,5 +1,6 @@
-from ollama import embed
 import logging
+from src.framework.core import embed_text
+from src.utils.helpers import load_config
 
 metadata = {
     "name": "embed",
@@ -9,10 +10,9 @@ metadata = {
 def execute(task: str) -> str:
     logger = logging.getLogger("EmbedTool")
     try:
-        response = embed(model="bge-m3:latest", input=task)
-        embedding = response.get("embedding", [])
+        embedding = embed_text(load_config("config.yaml") or {}, task)
         logger.info(f"Embedding generated for text: {task[:50]}...")
         return str(embedding)
     except Exception as e:
         logger.error(f"Embedding failed for '{task[:50]}...': {e}")
-        return f"Error: {str(e)}"
\ No newline at end of file
+        return f"Error: {str(e)}"
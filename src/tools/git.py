@@ -1,11 +1,87 @@
+import re
 import subprocess
 import logging
+import threading
+from typing import Dict, Optional, Tuple
 
 metadata = {
     "name": "git",
     "description": "Handles Git operations such as status, commit, and push."
 }
 
+HUNK_HEADER = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+def git(repo: str, *args: str) -> str:
+    result = subprocess.run(["git", "-c", "core.quotepath=off", *args], cwd=repo, capture_output=True, text=True, check=True)
+    return result.stdout
+
+class GitObjectReader:
+    """Reads blobs through one long-lived `git cat-file --batch` process instead of a subprocess per file."""
+
+    def __init__(self, repo: str = "."):
+        self.process = subprocess.Popen(["git", "cat-file", "--batch"], cwd=repo, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self._lock = threading.Lock()
+
+    def read(self, spec: str) -> Optional[bytes]:
+        """Contents of an object such as "HEAD:src/app.py", or None if it does not exist."""
+        with self._lock:
+            self.process.stdin.write(spec.encode("utf-8") + b"\n")
+            self.process.stdin.flush()
+            header = self.process.stdout.readline().split()
+            if len(header) != 3:  # "<spec> missing" or "<spec> ambiguous"
+                return None
+            data = self.process.stdout.read(int(header[2]))
+            self.process.stdout.read(1)  # trailing newline
+            return data
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.stdin.close()
+            self.process.wait()
+
+    def __enter__(self) -> "GitObjectReader":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def diff_hunks(repo: str, base: str, head: str, paths: Tuple[str, ...] = ("*.py",)) -> Dict[str, Dict]:
+    """Changed files between two revisions with the new-side line ranges each hunk touches.
+
+    Returns {path: {"status": "A"|"M"|"R"|"D", "old_path": str, "lines": [(start, end), ...]}} keyed by
+    the path at head (the old path for deletions). A pure deletion touches the lines around it.
+    """
+    # Explicit prefixes and --no-relative, since diff.noprefix, diff.mnemonicPrefix or diff.relative would change the paths
+    output = git(repo, "diff", "--no-color", "--no-ext-diff", "--no-relative", "--src-prefix=a/", "--dst-prefix=b/",
+                 "--unified=0", "-M", base, head, "--", *paths)
+    files: Dict[str, Dict] = {}
+    current = None
+    for line in output.splitlines():
+        if line.startswith("diff --git "):
+            current = {"status": "M", "old_path": None, "lines": []}
+        elif current is None:
+            continue
+        elif line.startswith("new file mode"):
+            current["status"] = "A"
+        elif line.startswith("deleted file mode"):
+            current["status"] = "D"
+        elif line.startswith("rename from "):
+            current["status"] = "R"
+            current["old_path"] = line[len("rename from "):]
+        elif line.startswith("--- ") and current["old_path"] is None and line != "--- /dev/null":
+            current["old_path"] = line[len("--- a/"):].rstrip("\t")
+        elif line.startswith("+++ "):
+            path = current["old_path"] if line == "+++ /dev/null" else line[len("+++ b/"):].rstrip("\t")
+            files[path] = current
+        elif line.startswith("rename to "):
+            files[line[len("rename to "):]] = current
+        elif line.startswith("@@"):
+            match = HUNK_HEADER.match(line)
+            if match:
+                start, count = int(match.group(1)), int(match.group(2) or 1)
+                current["lines"].append((start, start + count - 1) if count else (max(start, 1), start + 1))
+    return files
+
 def execute(task: str) -> str:
     logger = logging.getLogger("GitTool")
     try:
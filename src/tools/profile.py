@@ -0,0 +1,24 @@
+import logging
+from src.utils.helpers import load_config
+from src.utils.profiler import format_report, hotspot_sources, make_target, run_target
+
+metadata = {
+    "name": "profile",
+    "description": "Profiles Python code, a script or a module:function entry point with cProfile and tracemalloc, ranking the hottest functions and allocation sites."
+}
+
+def execute(task: str) -> str:
+    logger = logging.getLogger("ProfileTool")
+    try:
+        config = load_config("config.yaml") or {}
+        target = make_target(task)
+        result = run_target(config, target, line_sampling=config.get("profile_line_sampling", False))
+        report = format_report(result)
+        hotspots = hotspot_sources(result, target, limit=config.get("profile_hotspots", 5))
+        if hotspots:
+            report += "\nHotspot functions: " + ", ".join(f"{hotspot['path']}::{hotspot['name']}" for hotspot in hotspots)
+        logger.info(f"Profiled {target.get('entry_point') or target['filename']} in {result['wall_time']}s")
+        return report
+    except Exception as e:
+        logger.error(f"Profile tool error: {e}")
+        return f"Error: {str(e)}"
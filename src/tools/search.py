@@ -1,25 +1,95 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 import html2text
-import logging
+from src.utils.helpers import load_config
+from src.utils.http_cache import HTTPCache
 
 metadata = {
     "name": "search",
     "description": "Performs a web search using DuckDuckGo and extracts content as Markdown."
 }
 
+HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+MAX_RESULTS = 3
+MAX_MARKDOWN_CHARS = 2000
+
+_session: Optional[requests.Session] = None
+_http_caches: Dict[str, HTTPCache] = {}
+_lock = threading.Lock()
+
+def get_session() -> requests.Session:
+    """Return the pooled HTTP session shared by every search call."""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers.update(HEADERS)
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=MAX_RESULTS * 2)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+def get_http_cache(cache_dir: str) -> HTTPCache:
+    with _lock:
+        if cache_dir not in _http_caches:
+            _http_caches[cache_dir] = HTTPCache(cache_dir)
+        return _http_caches[cache_dir]
+
+def fetch(url: str, byte_budget: int, deadline: float, http_cache: HTTPCache = None, params: Dict[str, Any] = None,
+          responses: Dict[str, requests.Response] = None) -> str:
+    """GET a URL, reading at most byte_budget bytes and giving up at the monotonic deadline.
+
+    The open response is recorded in `responses` under the URL so a caller can close it at the deadline.
+    """
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError(f"Deadline passed before fetching {url}")
+
+    cache_key = requests.Request("GET", url, params=params).prepare().url
+    cached = http_cache.get(cache_key) if http_cache else None
+    headers = http_cache.conditional_headers(cached) if http_cache else {}
+    with get_session().get(url, params=params, headers=headers, timeout=min(10, remaining), stream=True) as response:
+        if responses is not None:
+            responses[url] = response
+        if response.status_code == 304 and cached:
+            return cached["body"]
+        response.raise_for_status()
+
+        chunks, size = [], 0
+        for chunk in response.iter_content(chunk_size=16384):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= byte_budget or time.monotonic() >= deadline:
+                break
+        body = b"".join(chunks)[:byte_budget].decode(response.encoding or "utf-8", errors="replace")
+        if http_cache and size < byte_budget:
+            http_cache.store(cache_key, response.headers, body)
+        return body
+
+def to_markdown(html: str) -> str:
+    h = html2text.HTML2Text()
+    h.ignore_links = False
+    return h.handle(html)[:MAX_MARKDOWN_CHARS]
+
 def execute(task: str) -> str:
     logger = logging.getLogger("SearchTool")
     query = task.strip()
-    url = f"https://duckduckgo.com/html/?q={query}"
-    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+    config = load_config("config.yaml") or {}
+    deadline = time.monotonic() + config.get("search_deadline", 20)
+    byte_budget = config.get("search_page_bytes", 256 * 1024)
+    http_cache = get_http_cache(config.get("http_cache_dir", "cache/http"))
 
     try:
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
-        results = []
-        for result in soup.select(".result__body")[:3]:  # Top 3 results
+        page = fetch(config.get("search_url", "https://duckduckgo.com/html/"), 1024 * 1024, deadline, http_cache, params={"q": query})
+        soup = BeautifulSoup(page, "html.parser")
+        hits = []
+        for result in soup.select(".result__body")[:MAX_RESULTS]:  # Top 3 results
             title = result.select_one(".result__title a") or "No title"
             title = title.text if hasattr(title, "text") else "No title"
             url = result.select_one(".result__url")
@@ -27,12 +97,28 @@ def execute(task: str) -> str:
             if url:
                 if not url.startswith(("http://", "https://")):
                     url = f"https://{url}"
-                h = html2text.HTML2Text()
-                h.ignore_links = False
-                markdown = h.handle(requests.get(url, headers=headers, timeout=10).text)
-                results.append(f"### {title}\n\n{markdown[:2000]}")
+                hits.append((title, url))
+
+        # Fetch result pages concurrently on this call's own threads, so pages another search is still
+        # waiting on never delay these; pages still loading at the deadline are closed and dropped
+        responses: Dict[str, requests.Response] = {}
+        executor = ThreadPoolExecutor(max_workers=max(1, len(hits)), thread_name_prefix="search")
+        futures = [executor.submit(fetch, url, byte_budget, deadline, http_cache, responses=responses) for _, url in hits]
+        wait(futures, timeout=max(0, deadline - time.monotonic()))
+        executor.shutdown(wait=False, cancel_futures=True)
+        results = []
+        for (title, url), future in zip(hits, futures):
+            if not future.done():
+                logger.warning(f"Search result {url} missed the deadline")
+                # shutdown() (urllib3 >= 2.3) aborts the read blocked in the fetch thread; close() would wait for it
+                if url in responses and hasattr(responses[url].raw, "shutdown"):
+                    responses[url].raw.shutdown()
+            elif future.exception():
+                logger.error(f"Failed to fetch search result {url}: {future.exception()}")
+            else:
+                results.append(f"### {title}\n\n{to_markdown(future.result())}")
         logger.info(f"Search completed for query: {query}")
         return "\n\n".join(results) if results else "No relevant web content found."
     except Exception as e:
         logger.error(f"Search failed for query '{query}': {e}")
-        return f"Error: {str(e)}"
\ No newline at end of file
+        return f"Error: {str(e)}"
@@ -0,0 +1,191 @@
+import ast
+import hashlib
+import textwrap
+from typing import Any, Dict, List, Optional
+
+MAX_CHUNK_CHARS = 4000
+
+def _is_anchor(name: str, tokens: int, group_tokens: int) -> bool:
+    """Whether a unit ends its group, with odds tokens / group_tokens so groups average group_tokens.
+
+    Depends only on the unit itself, so edits elsewhere in the module cannot move the boundary.
+    """
+    return int.from_bytes(hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest(), "little") % group_tokens < tokens
+
+def _segment(lines: List[str], start: int, end: int) -> str:
+    return "".join(lines[start - 1:end])
+
+def _node_start(node: ast.AST) -> int:
+    decorators = getattr(node, "decorator_list", [])
+    return min([node.lineno] + [decorator.lineno for decorator in decorators])
+
+def chunk_source(source: str, path: str = "<string>", max_chars: Optional[int] = MAX_CHUNK_CHARS) -> List[Dict[str, Any]]:
+    """Split Python source into function, method and class chunks with 1-based line ranges.
+
+    Chunk text is cut to max_chars, which suits embedding input; pass None for the full source.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+    lines = source.splitlines(keepends=True)
+    chunks = []
+
+    def add(name: str, kind: str, start: int, end: int):
+        text = _segment(lines, start, end)
+        if text.strip():
+            chunks.append({
+                "id": f"{path}::{name}",
+                "path": path,
+                "name": name,
+                "kind": kind,
+                "start_line": start,
+                "end_line": end,
+                "text": text[:max_chars] if max_chars else text,
+            })
+
+    def visit(nodes, prefix: str = ""):
+        for node in nodes:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                add(f"{prefix}{node.name}", "method" if prefix else "function", _node_start(node), node.end_lineno)
+            elif isinstance(node, ast.ClassDef):
+                members = [child for child in node.body if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))]
+                # The class chunk covers the header, docstring and attributes; members get their own chunks
+                header_end = _node_start(members[0]) - 1 if members else node.end_lineno
+                add(f"{prefix}{node.name}", "class", _node_start(node), max(node.lineno, header_end))
+                visit(members, f"{prefix}{node.name}.")
+
+    visit(tree.body)
+    if not chunks and source.strip():
+        add("<module>", "module", 1, len(lines))
+    return chunks
+
+def enclosing_chunk(chunks: List[Dict[str, Any]], line: int) -> Optional[Dict[str, Any]]:
+    """The innermost chunk from chunk_source whose line range contains line."""
+    containing = [chunk for chunk in chunks if chunk["start_line"] <= line <= chunk["end_line"]]
+    return min(containing, key=lambda chunk: chunk["end_line"] - chunk["start_line"], default=None)
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting prompts (about four characters per token for code)."""
+    return len(text) // 4 + 1
+
+def _signature(node: ast.AST) -> str:
+    """Source of a def/class header with the body elided, including method signatures for classes."""
+    if isinstance(node, ast.ClassDef):
+        bases = ", ".join(ast.unparse(base) for base in node.bases + node.keywords)
+        lines = [f"class {node.name}({bases}):" if bases else f"class {node.name}:"]
+        for child in node.body:
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                lines.append("    " + _signature(child))
+        return "\n".join(lines if len(lines) > 1 else lines + ["    ..."])
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    return f"{prefix} {node.name}({ast.unparse(node.args)}){returns}: ..."
+
+def _names_used(text: str) -> set:
+    """Bare names and self.<attr> names referenced in a snippet (which may be an indented method)."""
+    try:
+        tree = ast.parse(textwrap.dedent(text))
+    except SyntaxError:
+        return set()
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            names.add(node.id)
+        elif isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+            names.add(node.value.id)
+            if node.value.id in ("self", "cls"):
+                names.add(f"self.{node.attr}")
+    return names
+
+def split_for_budget(source: str, token_budget: int) -> List[Dict[str, Any]]:
+    """Split a module along AST boundaries into chunks under token_budget.
+
+    Each chunk carries a "context" string with only the imports, module-level signatures and
+    sibling method signatures its code refers to. Groups end after anchor units, picked from each
+    unit's own name and size (and earlier only when the budget runs out), so editing or adding a
+    function changes just its own group and leaves the other chunks' prompts unchanged.
+    Classes over budget are split into their methods; a single function over budget is kept whole.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return [{"name": "<module>", "start_line": 1, "end_line": len(source.splitlines()), "text": source, "context": ""}]
+    lines = source.splitlines(keepends=True)
+
+    imports, signatures = {}, {}
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            statement = ast.get_source_segment(source, node) or ast.unparse(node)
+            for alias in node.names:
+                imports[(alias.asname or alias.name).split(".")[0]] = statement
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            signatures[node.name] = _signature(node)
+
+    # Units: each def/class (or method of an oversized class), plus runs of other top-level statements
+    units = []
+    pending = []
+    classes = {}  # oversized classes split into methods: name -> (class line, method signatures)
+
+    def flush_statements():
+        if pending:
+            units.append(("<module>", _node_start(pending[0]), pending[-1].end_lineno, ""))
+            pending.clear()
+
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            continue
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            pending.append(node)
+            continue
+        flush_statements()
+        start, end = _node_start(node), node.end_lineno
+        if isinstance(node, ast.ClassDef) and estimate_tokens(_segment(lines, start, end)) > token_budget:
+            classes[node.name] = (
+                _signature(node).splitlines()[0],
+                {child.name: _signature(child) for child in node.body if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef))},
+            )
+            for child in node.body:
+                units.append((f"{node.name}.{getattr(child, 'name', '<body>')}", _node_start(child), child.end_lineno, node.name))
+        else:
+            units.append((node.name, start, end, ""))
+    flush_statements()
+
+    # Pack consecutive units up to the budget, closing groups at anchor names
+    chunks, current = [], []
+    group_tokens = max(1, token_budget // 2)  # leaves room before the budget forces a cut
+
+    def emit():
+        if not current:
+            return
+        text = "".join(_segment(lines, start, end) for _, start, end, _ in current)
+        used = _names_used(text)
+        defined = {name.split(".")[0] for name, _, _, _ in current}
+        context = [statement for name, statement in imports.items() if name in used]
+        context += [signature for name, signature in signatures.items() if name in used and name not in defined]
+        owner = current[0][3]
+        if owner:
+            class_line, methods = classes[owner]
+            own = {name.split(".", 1)[1] for name, _, _, _ in current}
+            context.append(class_line)
+            context += [f"    {signature}" for name, signature in methods.items() if f"self.{name}" in used and name not in own]
+        chunks.append({
+            "name": ", ".join(name for name, _, _, _ in current),
+            "start_line": current[0][1],
+            "end_line": current[-1][2],
+            "text": text,
+            "context": "\n".join(dict.fromkeys(context)),
+        })
+        current.clear()
+
+    size, anchor = 0, False
+    for unit in units:
+        unit_tokens = estimate_tokens(_segment(lines, unit[1], unit[2]))
+        if current and (anchor or size + unit_tokens > token_budget or unit[3] != current[-1][3]):
+            emit()
+            size = 0
+        current.append(unit)
+        size += unit_tokens
+        anchor = _is_anchor(unit[0], unit_tokens, group_tokens)
+    emit()
+    return chunks
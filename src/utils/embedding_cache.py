@@ -0,0 +1,252 @@
+import contextlib
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, so a cache directory must not be shared between processes
+    fcntl = None
+
+# Compaction keeps this share of max_entries, so its full rewrite happens once per many puts rather than on each
+LOW_WATERMARK = 0.8
+
+class EmbeddingCache:
+    """Content-addressed on-disk store of float32 embedding vectors for one embedding model.
+
+    Vectors are appended to a float32 file that is memory-mapped on read; the key -> row map lives in
+    SQLite. Writers hold an fcntl lock and number rows by the offset they write at, so processes sharing
+    the directory never hand out the same row. Resets and compaction write a new vector file and switch
+    to it with the row map in one transaction (the "generation"), so readers never pair rows with the
+    wrong file.
+    """
+
+    def __init__(self, cache_dir: str, model: str, max_entries: int = 50000):
+        self.cache_dir = Path(cache_dir)
+        self.model = model
+        self.max_entries = max(1, int(max_entries))
+        self.compactions = 0
+        self.db_path = self.cache_dir / "index.sqlite"
+        self.logger = logging.getLogger("EmbeddingCache")
+        self._lock = threading.RLock()
+        self._rows: Dict[str, int] = {}
+        self._touched: Dict[str, float] = {}
+        self._generation = -1
+        self._dim = 0
+        self._count = 0
+        self._vectors: Optional[np.memmap] = None
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock_file = open(self.cache_dir / "lock", "a+b")
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        with self._locked(exclusive=True):
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS rows (key TEXT PRIMARY KEY, row INTEGER NOT NULL, used REAL NOT NULL)")
+            self._db.commit()
+            stored = self._meta().get("model")
+            if stored != self.model:
+                if stored is not None:
+                    self.logger.info(f"Embedding model changed from {stored} to {self.model}; invalidating cache.")
+                self._reset()
+            else:
+                self._reload()
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{text}".encode("utf-8")).hexdigest()
+
+    @contextlib.contextmanager
+    def _locked(self, exclusive: bool):
+        """Cross-process lock on the cache directory; callers already hold self._lock."""
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _meta(self) -> Dict[str, str]:
+        return dict(self._db.execute("SELECT name, value FROM meta").fetchall())
+
+    def _vectors_path(self, generation: int) -> Path:
+        return self.cache_dir / f"vectors.{generation}.f32"
+
+    def _reload(self):
+        """Adopt the stored generation: its vector file, dimension and row map."""
+        meta = self._meta()
+        self._close()
+        self._generation = int(meta.get("generation", 0))
+        self._dim = int(meta.get("dim", 0))
+        path = self._vectors_path(self._generation)
+        size = path.stat().st_size if path.exists() else 0
+        self._count = size // (4 * self._dim) if self._dim else 0
+        self._rows = dict(self._db.execute("SELECT key, row FROM rows WHERE row < ?", (self._count,)).fetchall())
+
+    def _switch(self, matrix: Optional[np.ndarray], keys: List[str], used: List[float]):
+        """Write a new generation holding matrix (row i belongs to keys[i]) and make it current."""
+        generation = int(self._meta().get("generation", 0)) + 1
+        path = self._vectors_path(generation)
+        with path.open("wb") as f:
+            if matrix is not None:
+                f.write(matrix.tobytes())
+        with self._db:
+            self._db.execute("DELETE FROM rows")
+            self._db.executemany("INSERT INTO rows (key, row, used) VALUES (?, ?, ?)", zip(keys, range(len(keys)), used))
+            self._db.executemany(
+                "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                [("model", self.model), ("generation", str(generation)), ("dim", str(matrix.shape[1] if matrix is not None else 0))],
+            )
+        # Older generations (and files of writers that died before committing) are no longer referenced
+        for stale in self.cache_dir.glob("vectors*.f32"):
+            if stale != path:
+                stale.unlink(missing_ok=True)
+        (self.cache_dir / "index.json").unlink(missing_ok=True)
+        self._reload()
+
+    def _reset(self):
+        self._switch(None, [], [])
+
+    def _close(self):
+        if self._vectors is not None:
+            del self._vectors
+            self._vectors = None
+
+    def _view(self) -> Optional[np.ndarray]:
+        if not self._count:
+            return None
+        if self._vectors is None or self._vectors.shape[0] != self._count:
+            self._close()
+            self._vectors = np.memmap(self._vectors_path(self._generation), dtype=np.float32, mode="r", shape=(self._count, self._dim))
+        return self._vectors
+
+    def _lookup(self, keys: Sequence[str]):
+        """Pick up rows other processes stored for keys since the row map was loaded."""
+        with self._locked(exclusive=False):
+            if int(self._meta().get("generation", 0)) != self._generation:
+                self._reload()
+                return
+            found = []
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                found += self._db.execute(f"SELECT key, row FROM rows WHERE key IN ({','.join('?' * len(batch))})", batch).fetchall()
+            if found:
+                path = self._vectors_path(self._generation)
+                self._count = path.stat().st_size // (4 * self._dim) if self._dim else 0
+                self._rows.update((key, row) for key, row in found if row < self._count)
+
+    def get(self, text: str) -> Optional[List[float]]:
+        return self.get_many([text])[0]
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Return cached vectors for texts, with None for every miss."""
+        with self._lock:
+            keys = [self.key(text) for text in texts]
+            missing = [key for key in keys if key not in self._rows]
+            if missing:
+                self._lookup(list(dict.fromkeys(missing)))
+            view = self._view()
+            now = time.time()
+            results = []
+            for key in keys:
+                row = self._rows.get(key)
+                if row is None or view is None:
+                    results.append(None)
+                    continue
+                self._touched[key] = now
+                results.append(view[row].tolist())
+            return results
+
+    def put(self, text: str, vector: Sequence[float]):
+        self.put_many([text], [vector])
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[Sequence[float]]):
+        """Append new vectors to the store and record their rows."""
+        pending: Dict[str, Sequence[float]] = {}
+        for text, vector in zip(texts, vectors):
+            if vector is not None and len(vector):
+                pending.setdefault(self.key(text), vector)
+        if not pending:
+            return
+
+        with self._lock, self._locked(exclusive=True):
+            if int(self._meta().get("generation", 0)) != self._generation:
+                self._reload()
+            keys = list(pending)
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                self._rows.update(self._db.execute(f"SELECT key, row FROM rows WHERE key IN ({','.join('?' * len(batch))})", batch).fetchall())
+            pending = {key: vector for key, vector in pending.items() if key not in self._rows}
+            if not pending:
+                return
+            matrix = np.asarray(list(pending.values()), dtype=np.float32)
+            if self._dim and matrix.shape[1] != self._dim:
+                self.logger.info(f"Embedding dimension changed from {self._dim} to {matrix.shape[1]}; invalidating cache.")
+                self._reset()
+            if not self._dim:
+                with self._db:
+                    self._db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('dim', ?)", (str(matrix.shape[1]),))
+                self._dim = matrix.shape[1]
+
+            # Rows are numbered by where they land in the file, which may have grown in other processes;
+            # a partial row left by a writer that died mid-append is overwritten
+            row_bytes = 4 * self._dim
+            fd = os.open(self._vectors_path(self._generation), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                first = os.fstat(fd).st_size // row_bytes
+                os.pwrite(fd, matrix.tobytes(), first * row_bytes)
+            finally:
+                os.close(fd)
+            now = time.time()
+            with self._db:
+                self._db.executemany("INSERT INTO rows (key, row, used) VALUES (?, ?, ?)",
+                                     [(key, first + offset, now) for offset, key in enumerate(pending)])
+            self._rows.update((key, first + offset) for offset, key in enumerate(pending))
+            self._count = first + len(pending)
+
+            if self._count > self.max_entries:
+                self._compact()
+
+    def flush(self):
+        """Persist access times so eviction order survives restarts."""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            with self._db:
+                self._db.executemany("UPDATE rows SET used = ? WHERE key = ?", [(used, key) for key, used in touched.items()])
+
+    def _compact(self):
+        self.flush()
+        limit = max(1, int(self.max_entries * LOW_WATERMARK))
+        keep = self._db.execute("SELECT key, row, used FROM rows ORDER BY used DESC LIMIT ?", (limit,)).fetchall()
+        view = self._view()
+        matrix = np.array(view[[row for _, row, _ in keep]], dtype=np.float32)
+        self._close()
+        self._switch(matrix, [key for key, _, _ in keep], [used for _, _, used in keep])
+        self.compactions += 1
+        self.logger.info(f"Compacted embedding cache to {self._count} entries.")
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+_caches: Dict[tuple, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+def get_embedding_cache(config: Dict[str, Any]) -> EmbeddingCache:
+    """Return the process-wide embedding cache for the configured embedding model."""
+    cache_dir = config.get("embedding_cache_dir", "cache/embeddings")
+    model = config.get("embedding_model", "bge-m3:latest")
+    key = (os.path.abspath(cache_dir), model)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = EmbeddingCache(cache_dir, model, config.get("embedding_cache_max_entries", 50000))
+            _caches[key] = cache
+        return cache
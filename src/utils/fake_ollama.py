@@ -0,0 +1,158 @@
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+import numpy as np
+
+def fake_embedding(text: str, dim: int) -> List[float]:
+    """Deterministic unit vector for a text, so identical texts always embed identically."""
+    seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+    vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # the default of 5 drops connection bursts, adding 1s SYN retries to the numbers
+
+class FakeOllamaServer:
+    """Local stand-in for the ollama HTTP API (/api/chat, /api/embed) with deterministic replies and fixed latency."""
+
+    def __init__(self, reply: str = "Done.", chat_latency: float = 0.05, token_latency: float = 0.0,
+                 embed_latency: float = 0.005, load_latency: float = 0.0, dim: int = 1024, host: str = "127.0.0.1", port: int = 0):
+        self.reply = reply
+        self.load_latency = load_latency
+        self.loaded = None  # like a single GPU, one model is resident and switching models costs load_latency
+        self.chat_latency = chat_latency
+        self.token_latency = token_latency
+        self.embed_latency = embed_latency
+        self.dim = dim
+        self.requests: Dict[str, int] = {"chat": 0, "embed": 0}
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def count(self, endpoint: str):
+        with self._lock:
+            self.requests[endpoint] += 1
+
+    def load(self, model: str) -> float:
+        """Simulate loading a model's weights if another model is resident; returns the seconds spent."""
+        with self._lock:
+            if self.loaded == model or not self.load_latency:
+                self.loaded = model
+                return 0.0
+            self.loaded = model
+            time.sleep(self.load_latency)
+            return self.load_latency
+
+    def chat_chunks(self, request: Dict[str, Any], load_time: float = 0.0) -> List[Dict[str, Any]]:
+        """The NDJSON objects ollama would send for a chat request, one per token plus the final stats."""
+        prompt_tokens = sum(len(message.get("content", "").split()) for message in request.get("messages", []))
+        tokens = [word + " " for word in self.reply.split()]
+        tokens[-1] = tokens[-1].rstrip()
+        base = {"model": request.get("model", ""), "created_at": datetime.now(timezone.utc).isoformat()}
+        chunks = [dict(base, message={"role": "assistant", "content": token}, done=False) for token in tokens]
+        chunks.append(dict(
+            base, message={"role": "assistant", "content": ""}, done=True, done_reason="stop",
+            total_duration=int((load_time + self.chat_latency + self.token_latency * len(tokens)) * 1e9), load_duration=int(load_time * 1e9),
+            prompt_eval_count=prompt_tokens, prompt_eval_duration=int(self.chat_latency * 1e9),
+            eval_count=len(tokens), eval_duration=int(self.token_latency * len(tokens) * 1e9),
+        ))
+        return chunks
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def send_json(self, body: Dict[str, Any], status: int = 200):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/api/version":
+                    self.send_json({"version": "0.0.0-fake"})
+                elif self.path in ("/api/tags", "/api/ps"):
+                    self.send_json({"models": []})
+                else:
+                    self.send_json({"error": f"unknown endpoint {self.path}"}, 404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    self.send_json({"error": "invalid JSON body"}, 400)
+                    return
+
+                if self.path == "/api/embed":
+                    server.count("embed")
+                    load_time = server.load(request.get("model", ""))
+                    texts = request.get("input", [])
+                    texts = [texts] if isinstance(texts, str) else texts
+                    time.sleep(server.embed_latency)
+                    self.send_json({
+                        "model": request.get("model", ""), "embeddings": [fake_embedding(text, server.dim) for text in texts],
+                        "load_duration": int(load_time * 1e9), "total_duration": int((load_time + server.embed_latency) * 1e9),
+                    })
+                elif self.path == "/api/chat":
+                    server.count("chat")
+                    chunks = server.chat_chunks(request, server.load(request.get("model", "")))
+                    time.sleep(server.chat_latency)
+                    if request.get("stream", True):
+                        self.stream(chunks)
+                    else:
+                        final = dict(chunks[-1], message={"role": "assistant", "content": server.reply})
+                        if server.token_latency:
+                            time.sleep(server.token_latency * (len(chunks) - 1))
+                        self.send_json(final)
+                else:
+                    self.send_json({"error": f"unknown endpoint {self.path}"}, 404)
+
+            def stream(self, chunks: List[Dict[str, Any]]):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for chunk in chunks:
+                    if server.token_latency and not chunk["done"]:
+                        time.sleep(server.token_latency)
+                    data = json.dumps(chunk).encode("utf-8") + b"\n"
+                    self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
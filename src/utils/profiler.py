@@ -0,0 +1,275 @@
+import ast
+import cProfile
+import importlib
+import os
+import pstats
+import re
+import sys
+import textwrap
+import threading
+import time
+import traceback
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from src.utils.code_chunks import chunk_source, enclosing_chunk
+from src.utils.sandbox import _apply_limits, _capture_output, _peak_rss_kb, get_sandbox_pool
+
+ENTRY_POINT = re.compile(r"^[A-Za-z_][\w.]*:[A-Za-z_][\w.]*$")
+CODE_BLOCK = re.compile(r"```(?:python|py)?\s*\n(.*?)```", re.DOTALL)
+
+def make_target(spec: str) -> Dict[str, Any]:
+    """Profiling target for a script path, a "package.module:function" entry point, or inline code."""
+    spec = spec.strip()
+    if spec.endswith(".py") and os.path.isfile(spec):
+        with open(spec, "r", encoding="utf-8") as f:
+            return {"code": f.read(), "filename": os.path.abspath(spec)}
+    if ENTRY_POINT.match(spec):
+        return {"entry_point": spec}
+    return {"code": spec, "filename": "<profile>"}
+
+def _load(target: Dict[str, Any]):
+    if "entry_point" in target:
+        module_name, attribute = target["entry_point"].split(":")
+        function = importlib.import_module(module_name)
+        for part in attribute.split("."):
+            function = getattr(function, part)
+        return function
+    filename = target["filename"]
+    code = compile(target["code"], filename, "exec")
+    namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+    if os.path.isfile(filename):
+        namespace["__file__"] = filename
+        if os.path.dirname(filename) not in sys.path:
+            sys.path.insert(0, os.path.dirname(filename))
+    return lambda: exec(code, namespace)
+
+def _sample_lines(thread_id: int, interval: float, counts: Counter, stop: threading.Event):
+    while not stop.wait(interval):
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None and frame.f_lineno is not None and frame.f_code.co_filename != threading.__file__:
+            counts[(frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name)] += 1
+
+def _hot_functions(profiler: cProfile.Profile, top: int) -> List[Dict[str, Any]]:
+    rows = []
+    for (filename, line, name), (_, calls, self_time, cumulative, _) in pstats.Stats(profiler).stats.items():
+        if filename == __file__ or name == "<built-in method builtins.exec>" or name.startswith("<method 'disable' of '_lsprof"):
+            continue
+        rows.append({"file": filename, "line": line, "function": name, "calls": calls, "self_s": self_time, "cumulative_s": cumulative})
+    total = sum(row["self_s"] for row in rows) or 1.0
+    rows.sort(key=lambda row: -row["self_s"])
+    for row in rows:
+        row["share"] = row["self_s"] / total
+    return [row for row in rows if row["share"] >= 0.005][:top]
+
+def _allocation_sites(snapshot: tracemalloc.Snapshot, top: int) -> List[Dict[str, Any]]:
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(False, module.__file__) for module in (tracemalloc, cProfile, threading, sys.modules[__name__])])
+    statistics = snapshot.statistics("lineno")
+    total = sum(stat.size for stat in statistics) or 1
+    return [
+        {"file": stat.traceback[0].filename, "line": stat.traceback[0].lineno, "size_kb": stat.size / 1024, "blocks": stat.count}
+        for stat in statistics[:top] if stat.size / total >= 0.01
+    ]
+
+def _exit_code(e: SystemExit) -> int:
+    return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+
+def _repeat(target: Dict[str, Any], first_run: float) -> Tuple[float, int]:
+    """Re-run an unprofiled target until the runs add up to target["min_time"]; returns (mean seconds, runs).
+
+    The first run only warms up when there are more; each run gets a fresh namespace so module-level
+    caches from one run cannot speed up the next, and output after the first run is discarded.
+    """
+    total, runs = 0.0, 0
+    with _capture_output():
+        while first_run + total < target.get("min_time", 0):
+            function = _load(target)
+            started = time.perf_counter()
+            try:
+                function()
+            except SystemExit:
+                pass
+            total += time.perf_counter() - started
+            runs += 1
+    return (total / runs, runs) if runs else (first_run, 1)
+
+def _run_target(target: Dict[str, Any], conn, cpu_seconds: Optional[float], memory_mb: Optional[int]):
+    """Child entry point for SandboxPool: run a target, under cProfile and tracemalloc when target["profile"] is set."""
+    _apply_limits(cpu_seconds, memory_mb)
+    returncode = 0
+    profiling = target.get("profile", True)
+    profiler = cProfile.Profile() if profiling else None
+    samples, stop, sampler = Counter(), threading.Event(), None
+    wall_time = cpu_time = snapshot = traced_peak = None
+    runs = 1
+    with _capture_output() as output:
+        try:
+            function = _load(target)
+            if profiling:
+                tracemalloc.start()
+                if target.get("line_interval"):
+                    # The sampler needs the GIL to look at the main thread, so hand it over at least that often
+                    sys.setswitchinterval(min(target["line_interval"], sys.getswitchinterval()))
+                    sampler = threading.Thread(target=_sample_lines, args=(threading.get_ident(), target["line_interval"], samples, stop), daemon=True)
+                    sampler.start()
+            started, cpu_started = time.perf_counter(), time.process_time()
+            try:
+                profiler.runcall(function) if profiling else function()
+            except SystemExit as e:
+                returncode = _exit_code(e)
+            finally:
+                wall_time, cpu_time = time.perf_counter() - started, time.process_time() - cpu_started
+                stop.set()
+                if sampler is not None:
+                    sampler.join()
+                if tracemalloc.is_tracing():
+                    traced_peak = tracemalloc.get_traced_memory()[1] / 1024
+                    snapshot = tracemalloc.take_snapshot()
+                    tracemalloc.stop()
+            if not profiling and returncode == 0:
+                wall_time, runs = _repeat(target, wall_time)
+        except SystemExit as e:
+            returncode = _exit_code(e)
+        except BaseException:
+            returncode = 1
+            traceback.print_exc()
+
+    result = {
+        "returncode": returncode,
+        "stdout": output["stdout"],
+        "stderr": output["stderr"],
+        "wall_time": wall_time,
+        "cpu_time": cpu_time,
+        "runs": runs,
+        "peak_rss_kb": _peak_rss_kb(),
+        "timed_out": False,
+    }
+    if profiling and wall_time is not None:
+        top = target.get("top", 10)
+        total = sum(samples.values()) or 1
+        result.update(
+            functions=_hot_functions(profiler, top),
+            traced_peak_kb=traced_peak,
+            allocations=_allocation_sites(snapshot, top),
+            lines=[
+                {"file": filename, "line": line, "function": name, "samples": count, "share": count / total}
+                for (filename, line, name), count in samples.most_common(top)
+            ],
+        )
+    conn.send(result)
+    conn.close()
+
+def run_target(config: Dict[str, Any], target: Dict[str, Any], profile: bool = True, line_sampling: bool = False) -> Dict[str, Any]:
+    """Run a target in the sandbox pool, profiled unless profile is False.
+
+    Unprofiled runs repeat until they add up to profile_min_run_ms, and wall_time is the mean per run.
+    """
+    target = dict(target, profile=profile, top=config.get("profile_top", 10))
+    if not profile:
+        target["min_time"] = config.get("profile_min_run_ms", 200) / 1000
+    if profile and line_sampling:
+        target["line_interval"] = config.get("profile_line_interval_ms", 1) / 1000
+    return get_sandbox_pool(config).submit(target, timeout=config.get("profile_timeout"), runner=_run_target).result()
+
+def _display(filename: str) -> str:
+    """Path relative to the working directory when the file lives under it."""
+    if os.path.isabs(filename):
+        relative = os.path.relpath(filename)
+        return filename if relative.startswith("..") else relative
+    return filename
+
+def _location(filename: str, line: int) -> str:
+    return f"{_display(filename)}:{line}"
+
+def format_report(result: Dict[str, Any]) -> str:
+    """Compact ranking of the hottest functions, allocation sites and sampled lines."""
+    if result.get("timed_out") or result.get("cpu_time") is None:
+        return f"Profile failed: {result.get('stderr', '').strip()}"
+    lines = [f"wall {result['wall_time']:.3f}s, cpu {result['cpu_time']:.3f}s, peak RSS {result['peak_rss_kb'] / 1024:.1f} MiB"
+             + (f", traced peak {result['traced_peak_kb'] / 1024:.1f} MiB" if "traced_peak_kb" in result else "")]
+    if result["returncode"] != 0:
+        lines.append(f"exited with {result['returncode']}: {result['stderr'].strip().splitlines()[-1] if result['stderr'].strip() else ''}")
+    if result.get("functions"):
+        lines.append("Hottest functions (self time):")
+        lines += [f"  {i}. {row['self_s']:.3f}s self ({row['share']:.0%}), {row['cumulative_s']:.3f}s cumulative, {row['calls']} calls  "
+                  f"{row['function']}  {_location(row['file'], row['line'])}" for i, row in enumerate(result["functions"], 1)]
+    if result.get("allocations"):
+        lines.append("Largest allocation sites (live at exit):")
+        lines += [f"  {i}. {row['size_kb']:.1f} KiB in {row['blocks']} blocks  {_location(row['file'], row['line'])}"
+                  for i, row in enumerate(result["allocations"], 1)]
+    if result.get("lines"):
+        lines.append("Hottest lines (sampled):")
+        lines += [f"  {i}. {row['share']:.0%} of {row['samples']} samples  {row['function']}  {_location(row['file'], row['line'])}"
+                  for i, row in enumerate(result["lines"], 1)]
+    return "\n".join(lines)
+
+def hotspot_sources(result: Dict[str, Any], target: Dict[str, Any], limit: int = 5) -> List[Dict[str, Any]]:
+    """Source chunks of the functions behind the top profile entries, from the target or other files under the cwd."""
+    chunks: Dict[str, Optional[List[Dict[str, Any]]]] = {}
+
+    def chunks_of(filename: str) -> Optional[List[Dict[str, Any]]]:
+        if filename not in chunks:
+            chunks[filename] = None
+            if filename == target.get("filename"):
+                chunks[filename] = chunk_source(target["code"], _display(filename), max_chars=None)
+            elif os.path.isfile(filename) and not os.path.relpath(filename).startswith(".."):
+                with open(filename, "r", encoding="utf-8", errors="replace") as f:
+                    chunks[filename] = chunk_source(f.read(), _display(filename), max_chars=None)
+        return chunks[filename]
+
+    hotspots: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    locations = [(row["file"], row["line"], f"{row['self_s']:.3f}s self, {row['cumulative_s']:.3f}s cumulative") for row in result.get("functions", [])]
+    locations += [(row["file"], row["line"], f"{row['size_kb']:.1f} KiB allocated at line {row['line']}") for row in result.get("allocations", [])]
+    locations += [(row["file"], row["line"], f"{row['share']:.0%} of samples at line {row['line']}") for row in result.get("lines", [])]
+    for filename, line, measurement in locations:
+        chunk = enclosing_chunk(chunks_of(filename) or [], line)
+        if chunk is None:
+            continue
+        key = (filename, chunk["name"])
+        if key in hotspots:
+            hotspots[key]["measurements"].append(measurement)
+        elif len(hotspots) < limit:
+            hotspots[key] = dict(chunk, file=filename, measurements=[measurement])
+    return list(hotspots.values())
+
+def apply_functions(source: str, suggestion: str) -> Tuple[str, List[str]]:
+    """Replace functions in source with same-named definitions from the suggestion's Python code blocks.
+
+    Top-level defs replace a function or a method of that name; defs inside a class block replace
+    that class's methods. Returns the new source and the names replaced.
+    """
+    replacements: Dict[str, str] = {}
+    for block in CODE_BLOCK.findall(suggestion):
+        try:
+            tree = ast.parse(textwrap.dedent(block))
+        except SyntaxError:
+            continue
+        for node in tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                replacements[node.name] = ast.get_source_segment(textwrap.dedent(block), node, padded=False)
+            elif isinstance(node, ast.ClassDef):
+                for child in node.body:
+                    if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                        replacements[f"{node.name}.{child.name}"] = textwrap.dedent(ast.get_source_segment(textwrap.dedent(block), child, padded=True))
+
+    lines = source.splitlines(keepends=True)
+    functions = [chunk for chunk in chunk_source(source) if chunk["kind"] in ("function", "method")]
+    short_names = Counter(chunk["name"].rsplit(".", 1)[-1] for chunk in functions)
+    edits = []
+    for chunk in functions:
+        short_name = chunk["name"].rsplit(".", 1)[-1]
+        # A bare def may stand for a method, but only when no other method shares its name
+        new = replacements.get(chunk["name"]) or (replacements.get(short_name) if short_names[short_name] == 1 else None)
+        if new is None:
+            continue
+        span = lines[chunk["start_line"] - 1:chunk["end_line"]]
+        header = next(i for i, line in enumerate(span) if line.lstrip().startswith(("def ", "async def ")))
+        indent = span[header][:len(span[header]) - len(span[header].lstrip())]
+        decorators = "" if new.lstrip().startswith("@") else "".join(span[:header])
+        edits.append((chunk["start_line"], chunk["end_line"], decorators + textwrap.indent(new.rstrip() + "\n", indent), chunk["name"]))
+
+    replaced = []
+    for start, end, text, name in sorted(edits, reverse=True):
+        lines[start - 1:end] = [text]
+        replaced.append(name)
+    return "".join(lines), sorted(replaced)
@@ -0,0 +1,184 @@
+import contextlib
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits, wall-clock timeout still applies
+    resource = None
+
+# Imported once by the forkserver so every snippet starts from a warm template
+PRELOAD_MODULES = [
+    "collections", "itertools", "functools", "json", "re", "math", "random", "datetime",
+    "typing", "dataclasses", "string", "textwrap", "statistics", "decimal", "fractions",
+]
+
+MAX_OUTPUT_CHARS = 1024 * 1024
+
+def _peak_rss_kb() -> int:
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def _apply_limits(cpu_seconds: Optional[float], memory_mb: Optional[int]):
+    if resource is None:
+        return
+    if cpu_seconds:
+        seconds = int(cpu_seconds) + 1
+        resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds))
+    if memory_mb:
+        limit = int(memory_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+@contextlib.contextmanager
+def _capture_output():
+    """Point file descriptors 1 and 2 at temp files for the block, so output written by subprocesses,
+    os.system and C extensions is captured along with print(); yields a dict filled with both on exit."""
+    captured = {}
+    files = [tempfile.TemporaryFile(), tempfile.TemporaryFile()]
+    previous = (sys.stdout, sys.stderr)
+    for stream in previous:
+        if stream is not None:
+            stream.flush()
+    saved = [os.dup(1), os.dup(2)]
+    os.dup2(files[0].fileno(), 1)
+    os.dup2(files[1].fileno(), 2)
+    sys.stdout = open(1, "w", buffering=1, encoding="utf-8", errors="replace", closefd=False)
+    sys.stderr = open(2, "w", buffering=1, encoding="utf-8", errors="replace", closefd=False)
+    try:
+        yield captured
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        sys.stdout, sys.stderr = previous
+        for fd, saved_fd in ((1, saved[0]), (2, saved[1])):
+            os.dup2(saved_fd, fd)
+            os.close(saved_fd)
+        for name, f in zip(("stdout", "stderr"), files):
+            f.seek(0)
+            captured[name] = f.read(MAX_OUTPUT_CHARS * 4).decode("utf-8", errors="replace")[:MAX_OUTPUT_CHARS]
+            f.close()
+
+def _run_snippet(code: str, conn, cpu_seconds: Optional[float], memory_mb: Optional[int]):
+    """Child entry point: execute one snippet under resource limits and send back its outcome."""
+    _apply_limits(cpu_seconds, memory_mb)
+    returncode = 0
+    started, cpu_started = time.perf_counter(), time.process_time()
+    with _capture_output() as output:
+        try:
+            exec(compile(code, "<snippet>", "exec"), {"__name__": "__main__", "__builtins__": __builtins__})
+        except SystemExit as e:
+            returncode = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            if e.code is not None and not isinstance(e.code, int):
+                print(e.code, file=sys.stderr)
+        except BaseException:
+            returncode = 1
+            traceback.print_exc()
+    conn.send({
+        "returncode": returncode,
+        "stdout": output["stdout"],
+        "stderr": output["stderr"],
+        "wall_time": time.perf_counter() - started,
+        "cpu_time": time.process_time() - cpu_started,
+        "peak_rss_kb": _peak_rss_kb(),
+        "timed_out": False,
+    })
+    conn.close()
+
+class SandboxPool:
+    """Runs Python snippets in children forked from a warm forkserver, with per-run limits."""
+
+    def __init__(self, workers: int = None, queue_size: int = 64, timeout: float = 30, cpu_seconds: float = 30, memory_mb: int = 512):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.logger = logging.getLogger("SandboxPool")
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self._ctx = multiprocessing.get_context(method)
+        if method == "forkserver":
+            self._ctx.set_forkserver_preload(["__main__", __name__] + PRELOAD_MODULES)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sandbox")
+        self._slots = threading.BoundedSemaphore(self.workers + queue_size)
+        # Start the template interpreter now rather than on the first snippet
+        self.submit("pass")
+
+    def submit(self, code: Any, timeout: float = None, cpu_seconds: float = None, memory_mb: int = None, runner: Callable = None) -> Future:
+        """Queue a snippet, blocking while the pool already holds workers + queue_size snippets.
+
+        runner replaces the child entry point (default _run_snippet); it is called as
+        runner(code, conn, cpu_seconds, memory_mb) and must send one result dict on conn.
+        """
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(
+                self._run, code, runner or _run_snippet,
+                self.timeout if timeout is None else timeout,
+                self.cpu_seconds if cpu_seconds is None else cpu_seconds,
+                self.memory_mb if memory_mb is None else memory_mb,
+            )
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, code: str, **limits) -> Dict[str, Any]:
+        return self.submit(code, **limits).result()
+
+    def _run(self, code: Any, runner: Callable, timeout: float, cpu_seconds: float, memory_mb: int) -> Dict[str, Any]:
+        reader, writer = self._ctx.Pipe(duplex=False)
+        process = self._ctx.Process(target=runner, args=(code, writer, cpu_seconds, memory_mb), daemon=True)
+        started = time.perf_counter()
+        process.start()
+        writer.close()
+        try:
+            if reader.poll(timeout):
+                return reader.recv()
+            self.logger.warning(f"Snippet exceeded the {timeout}s wall-clock limit; killing it.")
+            process.kill()
+            return {
+                "returncode": -9, "stdout": "", "stderr": f"Timed out after {timeout}s",
+                "wall_time": time.perf_counter() - started, "cpu_time": None, "peak_rss_kb": None, "timed_out": True,
+            }
+        except EOFError:
+            # The child died without reporting, e.g. killed by RLIMIT_CPU
+            process.join(1)
+            return {
+                "returncode": process.exitcode, "stdout": "", "stderr": f"Process terminated with exit code {process.exitcode}",
+                "wall_time": time.perf_counter() - started, "cpu_time": None, "peak_rss_kb": None, "timed_out": False,
+            }
+        finally:
+            reader.close()
+            process.join(1)
+            if process.is_alive():
+                process.kill()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+_pool: Optional[SandboxPool] = None
+_pool_lock = threading.Lock()
+
+def get_sandbox_pool(config: Dict[str, Any]) -> SandboxPool:
+    """Return the process-wide sandbox pool, creating it from config on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SandboxPool(
+                workers=config.get("sandbox_workers"),
+                queue_size=config.get("sandbox_queue_size", 64),
+                timeout=config.get("sandbox_timeout", 30),
+                cpu_seconds=config.get("sandbox_cpu_seconds", 30),
+                memory_mb=config.get("sandbox_memory_mb", 512),
+            )
+        return _pool
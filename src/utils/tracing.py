@@ -0,0 +1,274 @@
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# Upper bounds (seconds) of the Prometheus latency histogram buckets
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Span attributes exported as token counters
+TOKEN_ATTRIBUTES = {"prompt_eval_count": "prompt", "eval_count": "completion"}
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "duration", "attributes", "status", "_started")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.time()
+        self.duration = None
+        self.attributes = dict(attributes)
+        self.status = "ok"
+        self._started = time.perf_counter()
+
+    def set(self, **attributes):
+        self.attributes.update({key: value for key, value in attributes.items() if value is not None})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name, "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+            "start": self.start, "duration": self.duration, "status": self.status, "attributes": self.attributes,
+        }
+
+class Tracer:
+    """Records spans to a JSONL file and keeps per-stage latency histograms for Prometheus export."""
+
+    def __init__(self, trace_file: str = None, metrics_file: str = None):
+        self.trace_file = trace_file
+        self.metrics_file = metrics_file
+        self.logger = logging.getLogger("Tracer")
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, List[float]] = {}  # name -> bucket counts + [sum, count]
+        self._tokens: Dict[tuple, int] = {}
+        self._trace_handle = None
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        span = self.start_span(name, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.set(error=f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+
+    def start_span(self, name: str, **attributes) -> Span:
+        """Start a span without making it current, for work that outlives a `with` block (generators)."""
+        return Span(name, _current_span.get(), attributes)
+
+    def end_span(self, span: Span):
+        span.duration = time.perf_counter() - span._started
+        self._finish(span)
+
+    def _finish(self, span: Span):
+        with self._lock:
+            histogram = self._histograms.setdefault(span.name, [0] * len(BUCKETS) + [0.0, 0])
+            for i, bound in enumerate(BUCKETS):
+                if span.duration <= bound:
+                    histogram[i] += 1
+            histogram[-2] += span.duration
+            histogram[-1] += 1
+            for attribute, kind in TOKEN_ATTRIBUTES.items():
+                if isinstance(span.attributes.get(attribute), int):
+                    key = (span.name, kind)
+                    self._tokens[key] = self._tokens.get(key, 0) + span.attributes[attribute]
+
+            if self.trace_file:
+                try:
+                    if self._trace_handle is None:
+                        Path(self.trace_file).parent.mkdir(parents=True, exist_ok=True)
+                        self._trace_handle = open(self.trace_file, "a", encoding="utf-8")
+                    self._trace_handle.write(json.dumps(span.to_dict(), default=str) + "\n")
+                    if span.parent_id is None:
+                        self._trace_handle.flush()
+                except Exception as e:
+                    self.logger.error(f"Failed to write span: {e}")
+                    self.trace_file = None
+        if span.parent_id is None and self.metrics_file:
+            self.write_metrics()
+
+    def metrics_text(self) -> str:
+        """Prometheus text exposition of stage latencies and token counts."""
+        with self._lock:
+            lines = [
+                "# HELP codewringer_stage_duration_seconds Latency of each traced stage.",
+                "# TYPE codewringer_stage_duration_seconds histogram",
+            ]
+            for name, histogram in sorted(self._histograms.items()):
+                for bound, count in zip(BUCKETS, histogram):
+                    lines.append(f'codewringer_stage_duration_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+                lines.append(f'codewringer_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {histogram[-1]}')
+                lines.append(f'codewringer_stage_duration_seconds_sum{{stage="{name}"}} {histogram[-2]}')
+                lines.append(f'codewringer_stage_duration_seconds_count{{stage="{name}"}} {histogram[-1]}')
+            lines += ["# HELP codewringer_tokens_total Prompt and completion tokens by stage.", "# TYPE codewringer_tokens_total counter"]
+            for (name, kind), count in sorted(self._tokens.items()):
+                lines.append(f'codewringer_tokens_total{{stage="{name}",kind="{kind}"}} {count}')
+            return "\n".join(lines) + "\n"
+
+    def write_metrics(self):
+        try:
+            path = Path(self.metrics_file)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_text(self.metrics_text())
+            os.replace(tmp_path, path)
+        except Exception as e:
+            self.logger.error(f"Failed to write metrics file: {e}")
+
+    def serve_metrics(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve metrics_text() at /metrics from a daemon thread."""
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = tracer.metrics_text().encode("utf-8")
+                self.send_response(200 if self.path.startswith("/metrics") else 404)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        return server
+
+    def close(self):
+        with self._lock:
+            if self._trace_handle is not None:
+                self._trace_handle.close()
+                self._trace_handle = None
+        if self.metrics_file:
+            self.write_metrics()
+
+_tracer = Tracer()
+_metrics_server = None
+atexit.register(lambda: _tracer.close())
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+def configure_tracing(config: Dict[str, Any]) -> Tracer:
+    """Point the process-wide tracer at the configured trace and metrics outputs."""
+    global _metrics_server
+    if config.get("tracing", True):
+        _tracer.trace_file = config.get("trace_file", "logs/traces.jsonl")
+        _tracer.metrics_file = config.get("metrics_file", "logs/metrics.prom")
+        if config.get("metrics_port") and _metrics_server is None:
+            _metrics_server = _tracer.serve_metrics(int(config["metrics_port"]))
+    return _tracer
+
+def span(name: str, **attributes):
+    return _tracer.span(name, **attributes)
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+def traced(name: str, **attributes):
+    """Decorator that wraps a sync or async function in a span."""
+    def decorator(function):
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with _tracer.span(name, **attributes):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with _tracer.span(name, **attributes):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def ollama_attributes(response: Any) -> Dict[str, Any]:
+    """Token counts and ollama's own timings (converted to seconds) from a chat/embed response."""
+    attributes = {}
+    for key in ("prompt_eval_count", "eval_count"):
+        value = response.get(key) if response is not None else None
+        if value is not None:
+            attributes[key] = value
+    for key in ("total_duration", "load_duration", "prompt_eval_duration", "eval_duration"):
+        value = response.get(key) if response is not None else None
+        if value is not None:
+            attributes[key] = value / 1e9
+    return attributes
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * fraction
+    lower, upper = math.floor(position), math.ceil(position)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def summarize(trace_file: str) -> Dict[str, Dict[str, float]]:
+    """Latency percentiles and token totals per span name from a JSONL trace file."""
+    durations: Dict[str, List[float]] = {}
+    tokens: Dict[str, Dict[str, int]] = {}
+    with open(trace_file, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            durations.setdefault(record["name"], []).append(record["duration"])
+            for attribute, kind in TOKEN_ATTRIBUTES.items():
+                value = record.get("attributes", {}).get(attribute)
+                if isinstance(value, int):
+                    stage_tokens = tokens.setdefault(record["name"], {})
+                    stage_tokens[kind] = stage_tokens.get(kind, 0) + value
+
+    summary = {}
+    for name, values in durations.items():
+        summary[name] = {
+            "count": len(values),
+            "p50": percentile(values, 0.5),
+            "p90": percentile(values, 0.9),
+            "p99": percentile(values, 0.99),
+            "max": max(values),
+            "prompt_tokens": tokens.get(name, {}).get("prompt", 0),
+            "completion_tokens": tokens.get(name, {}).get("completion", 0),
+        }
+    return summary
+
+def summarize_models(trace_file: str, span_name: str = "model.request") -> Dict[str, Dict[str, float]]:
+    """Seconds spent queued, loading weights, reading prompts and generating, per model, from a JSONL trace file."""
+    summary: Dict[str, Dict[str, float]] = {}
+    with open(trace_file, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("name") != span_name:
+                continue
+            attributes = record.get("attributes", {})
+            row = summary.setdefault(attributes.get("model", "?"), {
+                "requests": 0, "queue_wait_s": 0.0, "load_s": 0.0, "prompt_eval_s": 0.0, "eval_s": 0.0, "total_s": 0.0,
+            })
+            row["requests"] += 1
+            row["queue_wait_s"] += attributes.get("queue_wait", 0.0)
+            for key in ("load", "prompt_eval", "eval", "total"):
+                row[f"{key}_s"] += attributes.get(f"{key}_duration", 0.0)
+    return summary
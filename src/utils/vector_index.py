@@ -0,0 +1,93 @@
+import threading
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+import numpy as np
+
+class VectorIndex:
+    """In-memory cosine-similarity index over pre-normalized vectors stored in one matrix."""
+
+    def __init__(self, dim: int = 0, capacity: int = 64):
+        self.dim = dim
+        self._matrix = np.zeros((capacity, dim), dtype=np.float32) if dim else None
+        self._keys: List[Hashable] = []
+        self._positions: Dict[Hashable, int] = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _ensure_capacity(self, size: int):
+        capacity = self._matrix.shape[0]
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        grown = np.zeros((capacity, self.dim), dtype=np.float32)
+        grown[:len(self._keys)] = self._matrix[:len(self._keys)]
+        self._matrix = grown
+
+    def add(self, key: Hashable, vector: Sequence[float]):
+        self.add_many([key], [vector])
+
+    def add_many(self, keys: Sequence[Hashable], vectors: Sequence[Sequence[float]]):
+        """Insert or replace vectors; empty vectors are skipped."""
+        pairs = [(key, vector) for key, vector in zip(keys, vectors) if vector is not None and len(vector)]
+        if not pairs:
+            return
+        matrix = self._normalize(np.asarray([vector for _, vector in pairs], dtype=np.float32))
+
+        with self._lock:
+            if self._matrix is None:
+                self.dim = matrix.shape[1]
+                self._matrix = np.zeros((max(64, len(pairs)), self.dim), dtype=np.float32)
+            if matrix.shape[1] != self.dim:
+                raise ValueError(f"Vector dimension {matrix.shape[1]} does not match index dimension {self.dim}")
+
+            for (key, _), row in zip(pairs, matrix):
+                position = self._positions.get(key)
+                if position is None:
+                    position = len(self._keys)
+                    self._ensure_capacity(position + 1)
+                    self._keys.append(key)
+                    self._positions[key] = position
+                self._matrix[position] = row
+
+    def remove(self, key: Hashable) -> bool:
+        """Remove a key by swapping the last row into its slot."""
+        with self._lock:
+            position = self._positions.pop(key, None)
+            if position is None:
+                return False
+            last = len(self._keys) - 1
+            if position != last:
+                last_key = self._keys[last]
+                self._matrix[position] = self._matrix[last]
+                self._keys[position] = last_key
+                self._positions[last_key] = position
+            self._keys.pop()
+            return True
+
+    def search(self, query: Sequence[float], k: int = 5) -> List[Tuple[Hashable, float]]:
+        """Return up to k (key, cosine similarity) pairs, best first."""
+        with self._lock:
+            size = len(self._keys)
+            if not size or k <= 0 or query is None or len(query) != self.dim:
+                return []
+            query_vector = self._normalize(np.asarray(query, dtype=np.float32))
+            scores = self._matrix[:size] @ query_vector
+            k = min(k, size)
+            if k < size:
+                top = np.argpartition(-scores, k - 1)[:k]
+            else:
+                top = np.arange(size)
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(self._keys[i], float(scores[i])) for i in top]
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._positions
+
+    def __len__(self) -> int:
+        return len(self._keys)
@@ -0,0 +1,41 @@
+import random
+
+from src.utils.code_chunks import estimate_tokens, split_for_budget
+
+def _module(extra_lines: int = 0, insert: bool = False) -> str:
+    parts = ["import os\n\n"]
+    for i in range(60):
+        lines = random.Random(i).randint(3, 25) + (extra_lines if i == 2 else 0)
+        body = "".join(f"    x = x + {j} * os.sep.count('a')\n" for j in range(lines))
+        parts.append(f"def f{i}(x):\n{body}    return x\n\n")
+        if insert and i == 30:
+            parts.append("def inserted(x):\n    return x\n\n")
+    return "".join(parts)
+
+def _prompts(chunks):
+    return {(chunk["name"], chunk["text"], chunk["context"]) for chunk in chunks}
+
+def test_chunks_stay_under_budget():
+    chunks = split_for_budget(_module(), 3000)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk["text"]) <= 3000 for chunk in chunks)
+    assert [name for chunk in chunks for name in chunk["name"].split(", ")] == [f"f{i}" for i in range(60)]
+
+def test_editing_a_function_changes_only_its_chunks():
+    before = _prompts(split_for_budget(_module(), 3000))
+    after = split_for_budget(_module(extra_lines=20), 3000)
+
+    # Growing f2 can make it end its group or stop doing so, which touches at most the next chunk too
+    changed = [index for index, chunk in enumerate(after) if (chunk["name"], chunk["text"], chunk["context"]) not in before]
+    first = next(index for index, chunk in enumerate(after) if "f2" in chunk["name"].split(", "))
+    assert set(changed) <= {first, first + 1}
+    assert len(after) - len(changed) >= len(before) - 2
+
+def test_adding_a_function_changes_only_its_chunk():
+    before = _prompts(split_for_budget(_module(), 3000))
+    after = split_for_budget(_module(insert=True), 3000)
+
+    changed = [chunk for chunk in after if (chunk["name"], chunk["text"], chunk["context"]) not in before]
+    assert len(changed) == 1
+    assert "inserted" in changed[0]["name"].split(", ")
@@ -0,0 +1,68 @@
+import multiprocessing
+
+import numpy as np
+from src.utils.embedding_cache import LOW_WATERMARK, EmbeddingCache
+
+def test_compaction_is_spread_over_many_puts(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model", max_entries=100)
+    for i in range(600):
+        cache.put(f"text {i}", [float(i), 1.0])
+
+    # Each compaction frees room for max_entries * (1 - LOW_WATERMARK) puts
+    assert cache.compactions <= 600 // int(100 * (1 - LOW_WATERMARK))
+    assert int(100 * LOW_WATERMARK) <= len(cache) <= 100
+    assert cache.get("text 599") == [599.0, 1.0]
+
+def test_compaction_keeps_recently_used_entries(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model", max_entries=10)
+    for i in range(10):
+        cache.put(f"text {i}", [float(i)])
+    cache.get("text 0")
+    cache.put("text 10", [10.0])
+
+    assert cache.compactions == 1
+    assert cache.get("text 0") == [0.0]
+    assert cache.get("text 1") is None
+    assert EmbeddingCache(str(tmp_path), "model", max_entries=10).get("text 10") == [10.0]
+
+def _put_many(cache_dir: str, worker: int, count: int):
+    cache = EmbeddingCache(cache_dir, "model")
+    for start in range(0, count, 10):
+        keys = [f"{worker}-{i}" for i in range(start, start + 10)]
+        cache.put_many(keys, [[float(worker), float(i)] for i in range(start, start + 10)])
+
+def test_processes_sharing_a_directory_keep_their_own_vectors(tmp_path):
+    processes = [multiprocessing.get_context("spawn").Process(target=_put_many, args=(str(tmp_path), worker, 200)) for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    cache = EmbeddingCache(str(tmp_path), "model")
+    assert len(cache) == 800
+    for worker in range(4):
+        for i in range(200):
+            assert cache.get(f"{worker}-{i}") == [float(worker), float(i)]
+
+def test_instances_see_each_others_puts(tmp_path):
+    first, second = EmbeddingCache(str(tmp_path), "model"), EmbeddingCache(str(tmp_path), "model")
+    first.put("alpha", [1.0, 0.0])
+    second.put("beta", [0.0, 1.0])
+
+    assert first.get("beta") == [0.0, 1.0]
+    assert second.get("alpha") == [1.0, 0.0]
+
+def test_model_change_resets_the_cache(tmp_path):
+    EmbeddingCache(str(tmp_path), "model").put("alpha", [1.0, 0.0])
+
+    assert EmbeddingCache(str(tmp_path), "other").get("alpha") is None
+    assert EmbeddingCache(str(tmp_path), "model").get("alpha") is None
+
+def test_dimension_change_resets_the_cache(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model")
+    cache.put("alpha", [1.0, 0.0])
+    cache.put("beta", [0.0, 1.0, 0.0])
+
+    assert cache.get("alpha") is None
+    assert np.allclose(EmbeddingCache(str(tmp_path), "model").get("beta"), [0.0, 1.0, 0.0])
@@ -0,0 +1,41 @@
+import subprocess
+
+import pytest
+from src.tools.git import diff_hunks, git
+
+@pytest.fixture
+def repo(tmp_path):
+    def run(*args):
+        subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+
+    run("init", "-q")
+    run("config", "user.email", "test@example.com")
+    run("config", "user.name", "Test")
+    (tmp_path / "kept.py").write_text("def a():\n    return 1\n")
+    (tmp_path / "gone.py").write_text("def b():\n    return 2\n")
+    (tmp_path / "moved.py").write_text("".join(f"def f{i}():\n    return {i}\n\n" for i in range(10)))
+    run("add", "-A")
+    run("commit", "-qm", "base")
+    (tmp_path / "kept.py").write_text("def a():\n    return 10\n")
+    (tmp_path / "gone.py").unlink()
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "moved.py").rename(tmp_path / "sub" / "moved.py")
+    (tmp_path / "new.py").write_text("def c():\n    return 3\n")
+    run("add", "-A")
+    run("commit", "-qm", "head")
+    return tmp_path, run
+
+EXPECTED = {
+    "kept.py": {"status": "M", "old_path": "kept.py", "lines": [(2, 2)]},
+    "gone.py": {"status": "D", "old_path": "gone.py", "lines": [(1, 1)]},
+    "sub/moved.py": {"status": "R", "old_path": "moved.py", "lines": []},
+    "new.py": {"status": "A", "old_path": None, "lines": [(1, 2)]},
+}
+
+@pytest.mark.parametrize("setting", [None, ("diff.noprefix", "true")])
+def test_diff_hunks_ignores_diff_path_settings(repo, setting):
+    path, run = repo
+    if setting:
+        run("config", *setting)
+
+    assert diff_hunks(str(path), "HEAD~1", "HEAD") == EXPECTED
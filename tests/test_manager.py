@@ -0,0 +1,17 @@
+from src.framework.manager import ManagerAgent
+
+ITEMS = [{"name": name} for name in ("search", "Research Agent", "git", "embed", "Code Agent")]
+
+def selected(response, **kwargs):
+    return [item["name"] for item in ManagerAgent.select_delegates(response, ITEMS, **kwargs)]
+
+def test_names_inside_other_words_are_not_selected():
+    assert selected("The Research Agent should look into the embedding of digits.") == ["Research Agent"]
+
+def test_whole_names_are_selected_in_retrieval_order():
+    assert selected("Run git, then search for the code agent's docs.") == ["search", "git", "Code Agent"]
+
+def test_partial_responses_wait_for_the_word_to_end():
+    assert selected("Let me embed", partial=True) == []
+    assert selected("Let me embed it", partial=True) == ["embed"]
+    assert selected("Let me embed") == ["embed"]
@@ -0,0 +1,55 @@
+import os
+
+import pytest
+from src.framework.repo_index import RepoIndex
+from src.utils.fake_ollama import FakeOllamaServer
+
+@pytest.fixture
+def config(tmp_path):
+    with FakeOllamaServer(embed_latency=0, dim=64) as server:
+        yield {"ollama_host": server.url, "embedding_cache_dir": str(tmp_path / "embeddings"), "tracing": False, "embedding_model": "fake"}
+
+def _write(repo, name: str, functions: int):
+    (repo / name).write_text("".join(f"def {name[:-3]}_{j}(x):\n    return x + {j}\n\n" for j in range(functions)))
+
+def test_reader_does_not_truncate_a_batch_in_progress(tmp_path, config):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _write(repo, "a.py", 3)
+    writer = RepoIndex(config, str(repo))
+    writer.update()
+
+    # Vectors past the saved rows, as a writer leaves them between writing a batch and saving its assignments
+    with open(writer.vectors_path, "ab") as f:
+        f.write(b"\0" * 4 * 64 * 2)
+    size = os.path.getsize(writer.vectors_path)
+    reader = RepoIndex(config, str(repo), read_only=True)
+    results = reader.search("def a_1(x):\n    return x + 1\n", k=1)
+
+    assert os.path.getsize(writer.vectors_path) == size
+    assert results[0]["name"] == "a_1"
+
+def test_reader_sees_later_updates(tmp_path, config):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _write(repo, "a.py", 3)
+    writer = RepoIndex(config, str(repo))
+    writer.update()
+    reader = RepoIndex(config, str(repo), read_only=True)
+    assert reader.search("def b_0(x):\n    return x + 0\n", k=1)[0]["path"] == "a.py"
+
+    _write(repo, "b.py", 2)
+    (repo / "a.py").unlink()
+    writer.update()
+
+    results = reader.search("def b_0(x):\n    return x + 0\n", k=5)
+    assert [result["path"] for result in results] == ["b.py", "b.py"]
+    assert results[0]["name"] == "b_0"
+
+def test_read_only_index_refuses_updates(tmp_path, config):
+    reader = RepoIndex(config, str(tmp_path), read_only=True)
+
+    assert reader.search("anything") == []
+    with pytest.raises(RuntimeError):
+        reader.update()
+    assert not (tmp_path / ".codewringer").exists()
@@ -0,0 +1,21 @@
+import pytest
+from src.utils.sandbox import SandboxPool
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = SandboxPool(workers=1)
+    yield pool
+    pool.shutdown()
+
+def test_output_of_child_processes_is_captured(pool):
+    result = pool.run("import os, subprocess, sys\nprint('from-python')\nos.system('echo from-shell')\nsubprocess.run(['sh', '-c', 'echo from-sub >&2'])")
+
+    assert result["returncode"] == 0
+    assert result["stdout"] == "from-python\nfrom-shell\n"
+    assert result["stderr"] == "from-sub\n"
+
+def test_failures_report_the_traceback(pool):
+    result = pool.run("raise ValueError('boom')")
+
+    assert result["returncode"] == 1
+    assert result["stderr"].rstrip().endswith("ValueError: boom")
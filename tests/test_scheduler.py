@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+from src.framework.scheduler import ModelScheduler
+from src.utils.fake_ollama import FakeOllamaServer
+
+def _gate(scheduler: ModelScheduler, model: str = "gate", **kwargs):
+    """Occupy the host with a request that runs until the returned event is set."""
+    started, release = threading.Event(), threading.Event()
+
+    def run(client):
+        started.set()
+        release.wait(5)
+
+    future = scheduler.submit(None, model, run, **kwargs)
+    assert started.wait(5)
+    return future, release
+
+def _recorder(order, model):
+    return lambda client: order.append(model)
+
+def test_requests_are_grouped_by_model():
+    scheduler = ModelScheduler(parallel=1)
+    gate, release = _gate(scheduler)
+    order = []
+    futures = [scheduler.submit(None, model, _recorder(order, model)) for model in ["a", "b", "a", "b", "a"]]
+    release.set()
+    for future in futures:
+        future.result(5)
+
+    assert order == ["a", "a", "a", "b", "b"]
+    assert scheduler.report()["hosts"]["default"]["switches"] == 2
+
+def test_max_batch_hands_off_to_waiting_models():
+    scheduler = ModelScheduler(parallel=1, max_batch=2)
+    gate, release = _gate(scheduler, "a")
+    order = []
+    futures = [scheduler.submit(None, model, _recorder(order, model)) for model in ["a", "a", "a", "b"]]
+    release.set()
+    for future in futures:
+        future.result(5)
+
+    assert order == ["a", "b", "a", "a"]
+
+def test_errors_reach_the_caller_and_later_requests_still_run():
+    scheduler = ModelScheduler(parallel=1)
+
+    def fail(client):
+        raise RuntimeError("model not found")
+
+    failed = scheduler.submit(None, "a", fail)
+    ok = scheduler.submit(None, "a", lambda client: {"done": True})
+
+    with pytest.raises(RuntimeError, match="model not found"):
+        failed.result(5)
+    assert ok.result(5) == {"done": True}
+    stats = scheduler.report()["models"]["a"]
+    assert (stats["requests"], stats["errors"]) == (2, 1)
+
+def test_drain_waits_for_the_active_model():
+    scheduler = ModelScheduler(parallel=2)
+    gate, release = _gate(scheduler, "a")
+    other = scheduler.submit(None, "b", lambda client: {"model": "b"})
+
+    time.sleep(0.2)
+    assert not other.done()
+    release.set()
+    assert other.result(5) == {"model": "b"}
+
+@pytest.mark.parametrize("kwargs", [{"drain": False}, {"drain_hosts": {None: False}}])
+def test_drain_can_be_turned_off(kwargs):
+    scheduler = ModelScheduler(parallel=2, **kwargs)
+    gate, release = _gate(scheduler, "a")
+    try:
+        assert scheduler.submit(None, "b", lambda client: {"model": "b"}).result(5) == {"model": "b"}
+    finally:
+        release.set()
+
+def test_interactive_requests_neither_wait_nor_block():
+    scheduler = ModelScheduler(parallel=2)
+    gate, release = _gate(scheduler, "a")
+    try:
+        assert scheduler.submit(None, "b", lambda client: {"model": "b"}, interactive=True).result(5) == {"model": "b"}
+    finally:
+        release.set()
+
+    stream, release = _gate(scheduler, "manager", interactive=True)
+    try:
+        assert scheduler.submit(None, "worker", lambda client: {"model": "worker"}).result(5) == {"model": "worker"}
+    finally:
+        release.set()
+
+def test_streamed_chat_runs_beside_other_models():
+    with FakeOllamaServer(reply=" ".join(["word"] * 20), chat_latency=0.05, token_latency=0.05) as server:
+        config = {"ollama_host": server.url}
+        scheduler = ModelScheduler(parallel=4)
+        delegate = None
+        started = time.monotonic()
+        for chunk in scheduler.chat_stream(config, "manager", [{"role": "user", "content": "plan"}]):
+            if delegate is None:
+                delegate = scheduler.chat(config, "worker", [{"role": "user", "content": "work"}])
+        stream_done = time.monotonic() - started
+        delegate.result(5)
+
+    # The delegate (about 1.05 s) overlaps the stream (about 1.05 s) instead of starting after it
+    assert time.monotonic() - started < stream_done + 0.8
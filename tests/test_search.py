@@ -0,0 +1,105 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from src.tools import search
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+@pytest.fixture
+def site():
+    """Local stand-in for the search engine and the result pages it links to."""
+    state = {"requests": [], "etag": '"v1"', "slow": 5.0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def send_body(self, body: str, headers=None):
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            path, _, query = self.path.partition("?")
+            state["requests"].append((path, self.headers.get("If-None-Match")))
+            if path == "/html/":
+                pages = ["slow", "slow2", "slow3"] if "slow" in query else ["fast", "slow", "etag"]
+                self.send_body("".join(
+                    f'<div class="result__body"><h2 class="result__title"><a>{page} title</a></h2>'
+                    f'<a class="result__url">{state["url"]}/{page}</a></div>'
+                    for page in pages
+                ))
+            elif path.startswith("/slow"):
+                # Trickle the page so no single read times out before the search deadline
+                body = b" " * 100 + b"<p>too late</p>"
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                try:
+                    for i in range(len(body)):
+                        self.wfile.write(body[i:i + 1])
+                        self.wfile.flush()
+                        time.sleep(state["slow"] / len(body))
+                except OSError:
+                    pass
+            elif path == "/etag":
+                if self.headers.get("If-None-Match") == state["etag"]:
+                    self.send_response(304)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                else:
+                    self.send_body("<p>tagged page</p>", {"ETag": state["etag"]})
+            else:
+                self.send_body(f"<p>{path[1:]} page</p>")
+
+        def log_message(self, format, *args):
+            pass
+
+    server = _Server(("127.0.0.1", 0), Handler)
+    state["url"] = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield state
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def config(site, tmp_path, monkeypatch):
+    config = {"search_url": f"{site['url']}/html/", "search_deadline": 1, "http_cache_dir": str(tmp_path / "http")}
+    monkeypatch.setattr(search, "load_config", lambda path: config)
+    return config
+
+def test_pages_past_the_deadline_are_dropped(site, config):
+    started = time.monotonic()
+    result = search.execute("fast")
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 2
+    assert "fast page" in result
+    assert "tagged page" in result
+    assert "too late" not in result
+
+def test_slow_search_does_not_starve_a_concurrent_one(site, config):
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        slow = executor.submit(search.execute, "slow")
+        time.sleep(0.2)  # let the slow search occupy its fetch threads first
+        fast = executor.submit(search.execute, "fast")
+        assert "fast page" in fast.result()
+        assert slow.result() == "No relevant web content found."
+
+def test_not_modified_reuses_the_stored_body(site, config):
+    first = search.execute("fast")
+    second = search.execute("fast")
+
+    conditional = [validator for path, validator in site["requests"] if path == "/etag"]
+    assert conditional == [None, site["etag"]]
+    assert "tagged page" in first
+    assert "tagged page" in second